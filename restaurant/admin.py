@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import path
@@ -6,7 +7,12 @@ from django.contrib import messages
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.db.models import Count, Sum, Avg
-from .models import Category, MenuItem, Order, OrderItem, Reservation, Review
+from . import exports, search, transitions
+from .pagination import EstimatedCountPaginator
+from .models import Category, Job, MenuItem, Order, OrderItem, Reservation, Review, TimeSlot
+
+# More matches than this are not useful in a changelist
+ADMIN_SEARCH_LIMIT = 1000
 
 class MenuItemAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'is_available', 'created_at')
@@ -14,6 +20,13 @@ class MenuItemAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     list_editable = ('is_available',)
     list_per_page = 20
+    list_select_related = ('category',)
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Ranked full-text search instead of icontains scans over name and description
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search.search_ids(search_term, limit=ADMIN_SEARCH_LIMIT, available_only=False)), False
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -24,9 +37,40 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer_info', 'total_amount', 'status', 'order_date', 'custom_actions')
     list_filter = ('status', 'order_date')
     search_fields = ('customer_name', 'customer_email', 'id')
+    search_help_text = 'Order number, full email address or part of the customer name'
     inlines = [OrderItemInline]
     readonly_fields = ('order_date', 'total_amount', 'customer_name', 'customer_email', 'customer_phone')
     list_per_page = 20
+    list_select_related = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['mark_processing', 'mark_completed', 'export_csv']
+    
+    @admin.action(description='Mark selected Pending orders as Processing')
+    def mark_processing(self, request, queryset):
+        moved = transitions.transition_orders(list(queryset.values_list('id', flat=True)), 'Processing', source='Pending')
+        messages.success(request, f'{len(moved)} order(s) are now being processed.')
+    
+    @admin.action(description='Mark selected Processing orders as Completed')
+    def mark_completed(self, request, queryset):
+        moved = transitions.transition_orders(list(queryset.values_list('id', flat=True)), 'Completed', source='Processing')
+        messages.success(request, f'{len(moved)} order(s) completed.')
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Order numbers and email addresses are looked up exactly so they use an index;
+        # the default icontains across every search field scans the whole table
+        term = search_term.strip()
+        if term.startswith('#'):
+            term = term[1:]
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        if '@' in term and ' ' not in term:
+            return queryset.filter(customer_email__in={term, term.lower()}), False
+        return super().get_search_results(request, queryset, search_term)
+    
+    @admin.action(description='Export selected orders with items (CSV)')
+    def export_csv(self, request, queryset):
+        return exports.stream(exports.order_rows(queryset), exports.ORDER_COLUMNS, 'csv', 'orders')
     
     def customer_info(self, obj):
         if obj.user:
@@ -61,7 +105,7 @@ class OrderAdmin(admin.ModelAdmin):
         order = get_object_or_404(Order, id=order_id)
         if order.status == 'Pending':
             order.status = 'Processing'
-            order.save()
+            order.save(update_fields=['status'])
             messages.success(request, f'Order #{order.id} is now being processed.')
         else:
             messages.error(request, 'Order cannot be processed at this stage.')
@@ -71,20 +115,50 @@ class OrderAdmin(admin.ModelAdmin):
         order = get_object_or_404(Order, id=order_id)
         if order.status == 'Processing':
             order.status = 'Completed'
-            order.save()
+            order.save(update_fields=['status'])
             messages.success(request, f'Order #{order.id} has been completed.')
         else:
             messages.error(request, 'Order cannot be completed at this stage.')
         return HttpResponseRedirect(reverse('admin:restaurant_order_changelist'))
 
+class ReservationChangeListForm(forms.ModelForm):
+    def clean_confirmed(self):
+        confirmed = self.cleaned_data['confirmed']
+        if confirmed and self.instance.cancelled and not self.instance.confirmed:
+            raise forms.ValidationError('A cancelled reservation cannot be confirmed.')
+        return confirmed
+
 class ReservationAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'phone', 'date', 'time', 'number_of_guests', 'confirmed', 'confirmation_action')
-    list_filter = ('confirmed', 'date')
+    list_display = ('name', 'email', 'phone', 'date', 'time', 'number_of_guests', 'confirmed', 'cancelled', 'confirmation_action')
+    list_filter = ('confirmed', 'cancelled', 'date')
     search_fields = ('name', 'email', 'phone')
     list_editable = ('confirmed',)
     list_per_page = 20
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['confirm_reservations', 'cancel_reservations', 'export_csv']
+    
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ReservationChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+    
+    @admin.action(description='Export selected reservations (CSV)')
+    def export_csv(self, request, queryset):
+        return exports.stream(exports.reservation_rows(queryset), exports.RESERVATION_COLUMNS, 'csv', 'reservations')
+    
+    @admin.action(description='Confirm selected reservations')
+    def confirm_reservations(self, request, queryset):
+        confirmed = transitions.confirm_reservations(list(queryset.values_list('id', flat=True)))
+        messages.success(request, f'{len(confirmed)} reservation(s) confirmed.')
+    
+    @admin.action(description='Cancel selected reservations')
+    def cancel_reservations(self, request, queryset):
+        cancelled = transitions.cancel_reservations(list(queryset.values_list('id', flat=True)))
+        messages.success(request, f'{len(cancelled)} reservation(s) cancelled.')
     
     def confirmation_action(self, obj):
+        if obj.cancelled:
+            return 'Cancelled'
         if not obj.confirmed:
             return format_html(
                 '<a class="button" href="{}" style="padding: 5px 10px; background-color: #FF9800; color: white; text-decoration: none; border-radius: 3px;">Confirm</a>',
@@ -103,19 +177,29 @@ class ReservationAdmin(admin.ModelAdmin):
     
     def confirm_reservation(self, request, reservation_id):
         reservation = get_object_or_404(Reservation, id=reservation_id)
-        if not reservation.confirmed:
+        if reservation.cancelled:
+            messages.error(request, f'Reservation for {reservation.name} was cancelled and cannot be confirmed.')
+        elif not reservation.confirmed:
             reservation.confirmed = True
-            reservation.save()
+            reservation.save(update_fields=['confirmed'])
             messages.success(request, f'Reservation for {reservation.name} has been confirmed.')
         else:
             messages.info(request, 'Reservation was already confirmed.')
         return HttpResponseRedirect(reverse('admin:restaurant_reservation_changelist'))
 
+class TimeSlotAdmin(admin.ModelAdmin):
+    list_display = ('start', 'seats')
+    list_editable = ('seats',)
+
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('menu_item', 'user', 'rating', 'created_at', 'short_comment')
     list_filter = ('rating', 'created_at')
     search_fields = ('menu_item__name', 'user__username', 'comment')
     list_per_page = 20
+    # Review.__str__ and the menu_item/user columns all follow these foreign keys
+    list_select_related = ('menu_item', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def short_comment(self, obj):
         if obj.comment:
@@ -123,9 +207,18 @@ class ReviewAdmin(admin.ModelAdmin):
         return 'No comment'
     short_comment.short_description = 'Comment'
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('attempts', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    list_per_page = 20
+
 # Register models with enhanced admin
 admin.site.register(Category)
 admin.site.register(MenuItem, MenuItemAdmin)
 admin.site.register(Order, OrderAdmin)
 admin.site.register(Reservation, ReservationAdmin)
-admin.site.register(Review, ReviewAdmin)
\ No newline at end of file
+admin.site.register(Review, ReviewAdmin)
+admin.site.register(TimeSlot, TimeSlotAdmin)
+admin.site.register(Job, JobAdmin)
\ No newline at end of file
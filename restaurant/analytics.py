@@ -0,0 +1,129 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .counters import increment
+from .models import DailyItemSales, DailySales, Order, OrderItem, Review
+
+COMPLETED = 'Completed'
+
+
+def _bump(model, key, **deltas):
+    """Add ``deltas`` to the rollup row for ``key``, creating it on first use."""
+    increment(model, key, deltas)
+
+
+def record_order(order_id, sign=1):
+    """Add a completed order to the rollups, or take it back out with ``sign=-1``."""
+    record_orders([order_id], sign)
+
+
+def record_orders(order_ids, sign=1):
+    """``record_order`` for a batch, with one rollup update per day and per day and item."""
+    day_of = {}
+    days = defaultdict(lambda: {'orders': 0, 'items_sold': 0, 'revenue': Decimal('0')})
+    for order_id, order_date, total_amount in Order.objects.filter(pk__in=order_ids).values_list('id', 'order_date', 'total_amount'):
+        day_of[order_id] = timezone.localdate(order_date)
+        days[day_of[order_id]]['orders'] += 1
+        days[day_of[order_id]]['revenue'] += total_amount
+    items = defaultdict(lambda: {'orders': 0, 'quantity': 0, 'revenue': Decimal('0')})
+    for line in (
+        OrderItem.objects.filter(order_id__in=day_of)
+        .values('order_id', 'menu_item_id')
+        .annotate(units=Sum('quantity'), sales=Sum(F('quantity') * F('price')))
+        .order_by()
+    ):
+        day = day_of[line['order_id']]
+        days[day]['items_sold'] += line['units']
+        item = items[day, line['menu_item_id']]
+        item['orders'] += 1
+        item['quantity'] += line['units']
+        item['revenue'] += line['sales']
+    for day, totals in days.items():
+        _bump(DailySales, {'date': day}, **{field: sign * value for field, value in totals.items()})
+    for (day, menu_item_id), totals in items.items():
+        _bump(DailyItemSales, {'date': day, 'menu_item_id': menu_item_id}, **{field: sign * value for field, value in totals.items()})
+
+
+def record_rating(menu_item_id, created_at, rating, count):
+    if menu_item_id is None or created_at is None:
+        return
+    _bump(
+        DailyItemSales, {'date': timezone.localdate(created_at), 'menu_item_id': menu_item_id},
+        rating_sum=rating, rating_count=count,
+    )
+
+
+def rebuild(start, end):
+    """Recompute the rollups for ``start``..``end`` (inclusive) from orders and reviews."""
+    days = {}
+    items = {}
+    completed = Order.objects.filter(status=COMPLETED, order_date__date__range=(start, end))
+    for row in (
+        completed.annotate(day=TruncDate('order_date')).values('day').order_by()
+        .annotate(order_count=Count('id'), sales=Sum('total_amount'))
+    ):
+        days[row['day']] = DailySales(date=row['day'], orders=row['order_count'], revenue=row['sales'])
+    for row in (
+        OrderItem.objects.filter(order__in=completed)
+        .annotate(day=TruncDate('order__order_date')).values('day', 'menu_item_id').order_by()
+        .annotate(order_count=Count('order_id', distinct=True), units=Sum('quantity'), sales=Sum(F('quantity') * F('price')))
+    ):
+        days[row['day']].items_sold += row['units']
+        items[row['day'], row['menu_item_id']] = DailyItemSales(
+            date=row['day'], menu_item_id=row['menu_item_id'],
+            orders=row['order_count'], quantity=row['units'], revenue=row['sales'],
+        )
+    for row in (
+        Review.objects.filter(menu_item__isnull=False, created_at__date__range=(start, end))
+        .annotate(day=TruncDate('created_at')).values('day', 'menu_item_id').order_by()
+        .annotate(ratings=Sum('rating'), reviews=Count('id'))
+    ):
+        item = items.setdefault(
+            (row['day'], row['menu_item_id']),
+            DailyItemSales(date=row['day'], menu_item_id=row['menu_item_id'], revenue=Decimal('0')),
+        )
+        item.rating_sum, item.rating_count = row['ratings'], row['reviews']
+
+    with transaction.atomic():
+        DailySales.objects.filter(date__range=(start, end)).delete()
+        DailyItemSales.objects.filter(date__range=(start, end)).delete()
+        DailySales.objects.bulk_create(days.values(), batch_size=1000)
+        DailyItemSales.objects.bulk_create(items.values(), batch_size=1000)
+    return len(days), len(items)
+
+
+def report(start, end, top=10):
+    """Totals, a daily series and the best sellers for a date range, read only from the rollups."""
+    days = list(DailySales.objects.filter(date__range=(start, end)).values('date', 'orders', 'items_sold', 'revenue'))
+    totals = DailySales.objects.filter(date__range=(start, end)).aggregate(
+        orders=Sum('orders'), items_sold=Sum('items_sold'), revenue=Sum('revenue'),
+    )
+    top_items = list(
+        DailyItemSales.objects.filter(date__range=(start, end))
+        .values('menu_item_id', 'menu_item__name')
+        .annotate(
+            quantity=Sum('quantity'), revenue=Sum('revenue'), orders=Sum('orders'),
+            rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'),
+        )
+        .filter(quantity__gt=0)
+        .order_by('-revenue', 'menu_item__name')[:top]
+    )
+    for item in top_items:
+        item['average_rating'] = round(item['rating_sum'] / item['rating_count'], 1) if item['rating_count'] else None
+    orders = totals['orders'] or 0
+    revenue = (totals['revenue'] or Decimal('0')).quantize(Decimal('0.01'))
+    return {
+        'start': start,
+        'end': end,
+        'orders': orders,
+        'items_sold': totals['items_sold'] or 0,
+        'revenue': revenue,
+        'average_order_value': (revenue / orders).quantize(Decimal('0.01')) if orders else Decimal('0.00'),
+        'days': days,
+        'top_items': top_items,
+    }
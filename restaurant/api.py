@@ -0,0 +1,211 @@
+import json
+from decimal import Decimal
+from functools import wraps
+
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from . import cart, orders
+from .cache import aget_home_data, aget_menu_json, aset_menu_json
+from .models import MenuItem, Order, OrderItem
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def login_required(view):
+    # The page decorator would redirect to the login form; an API client wants a 401
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('Log in first.', status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _payload(request):
+    """The request body as a dict: JSON, or the form fields. None if the JSON is malformed."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    if request.method in ('PATCH', 'PUT') and request.content_type == 'application/x-www-form-urlencoded':
+        # Django only parses form bodies for POST
+        return QueryDict(request.body, encoding=request.encoding)
+    return request.POST
+
+
+# The largest primary key the database can hold; anything bigger would overflow the query
+MAX_ID = 2 ** 63 - 1
+
+
+def _quantity(value, default=None, maximum=cart.MAX_QUANTITY):
+    try:
+        number = int(value if value is not None else default)
+    except (TypeError, ValueError):
+        return None
+    return number if number <= maximum else None
+
+
+# Serializers are plain functions over rows already in hand, or values() dicts,
+# so no response costs a query per object
+
+def serialize_menu_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'price': str(item.price),
+        'category_id': item.category_id,
+        'image': item.thumbnail_url,
+        'rating': item.average_rating if item.rating_count else None,
+    }
+
+
+def serialize_cart_line(line):
+    return {
+        'menu_item_id': line['menu_item_id'],
+        'name': line['menu_item__name'],
+        'price': str(line['menu_item__price']),
+        'quantity': line['quantity'],
+        'subtotal': str(line['menu_item__price'] * line['quantity']),
+        'available': line['menu_item__is_available'],
+    }
+
+
+def serialize_order(order, items):
+    return {
+        'id': order.id,
+        'status': order.status,
+        'order_date': order.order_date.isoformat(),
+        'total_amount': str(order.total_amount),
+        'items': [
+            {'menu_item_id': item['menu_item_id'], 'name': item['name'], 'quantity': item['quantity'], 'price': str(item['price'])}
+            for item in items
+        ],
+    }
+
+
+@require_GET
+async def menu(request):
+    # Same cached data and fingerprint as the home page, so both change together
+    data = await aget_home_data()
+    etag = quote_etag(data['etag'])
+    last_modified = int(data['last_modified'].timestamp()) if data['last_modified'] else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content = await aget_menu_json(data['etag'])
+        if content is None:
+            content = json.dumps({
+                'categories': [
+                    {
+                        'id': category.id,
+                        'name': category.name,
+                        'items': [serialize_menu_item(item) for item in category.available_items],
+                    }
+                    for category in data['categories']
+                ],
+            }).encode()
+            await aset_menu_json(data['etag'], content)
+        response = HttpResponse(content, content_type='application/json')
+    response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@login_required
+@require_GET
+def cart_detail(request):
+    lines = cart.get_line_values(request.user)
+    total = sum(
+        (line['menu_item__price'] * line['quantity'] for line in lines if line['menu_item__is_available']), Decimal('0.00')
+    )
+    return JsonResponse({
+        'items': [serialize_cart_line(line) for line in lines],
+        'count': sum(line['quantity'] for line in lines),
+        'total': str(total),
+    })
+
+
+@login_required
+@require_POST
+def cart_add(request):
+    data = _payload(request)
+    if data is None:
+        return _error('Send a JSON object.')
+    menu_item_id, quantity = _quantity(data.get('menu_item_id'), maximum=MAX_ID), _quantity(data.get('quantity'), default=1)
+    if menu_item_id is None or quantity is None or quantity < 1:
+        return _error('Pass a menu_item_id and a positive quantity.')
+    if not MenuItem.objects.filter(pk=menu_item_id, is_available=True).exists():
+        return _error('That item is not on the menu.', status=404)
+    cart.add_item(request.user, menu_item_id, quantity)
+    # Only what the page needs to update its badge
+    return JsonResponse({'count': cart.get_item_count(request.user)})
+
+
+@login_required
+@require_http_methods(['PATCH', 'PUT', 'DELETE'])
+def cart_item(request, item_id):
+    if request.method == 'DELETE':
+        changed = cart.remove_item(request.user, item_id)
+    else:
+        data = _payload(request)
+        quantity = _quantity(data.get('quantity')) if data is not None else None
+        if quantity is None:
+            return _error('Pass the new quantity; 0 removes the item.')
+        changed = cart.update_quantity(request.user, item_id, quantity)
+    if not changed:
+        return _error('That item is not in your order.', status=404)
+    return HttpResponse(status=204)
+
+
+@login_required
+@require_POST
+def checkout(request):
+    data = _payload(request)
+    if data is None:
+        return _error('Send a JSON object.')
+    customer_name, customer_email = data.get('customer_name'), data.get('customer_email')
+    if not customer_name or not customer_email:
+        return _error('customer_name and customer_email are required.')
+    # Retrying with the same key returns the first order rather than placing another
+    token = request.headers.get('Idempotency-Key') or data.get('checkout_token')
+    if token is not None and not isinstance(token, str):
+        return _error('checkout_token must be a string.')
+    if token and len(token) > orders.TOKEN_MAX_LENGTH:
+        return _error(f'Idempotency-Key is limited to {orders.TOKEN_MAX_LENGTH} characters.')
+    try:
+        order, created = orders.place_order(
+            request.user, customer_name, customer_email, data.get('customer_phone', ''), token=token,
+        )
+    except orders.EmptyCart as exc:
+        return _error(str(exc))
+    except orders.UnavailableItems as exc:
+        return _error('Some items are no longer available.', status=409, unavailable=exc.names)
+    response = JsonResponse(serialize_order(order, _order_items(order)), status=201 if created else 200)
+    response['Location'] = reverse('api_order', args=[order.id])
+    return response
+
+
+def _order_items(order):
+    return OrderItem.objects.filter(order=order).order_by('id').values(
+        'menu_item_id', 'quantity', 'price', name=F('menu_item__name'),
+    )
+
+
+@login_required
+@require_GET
+def order_status(request, order_id):
+    order = Order.objects.filter(pk=order_id, user=request.user).only('id', 'status', 'order_date', 'total_amount').first()
+    if order is None:
+        return _error('No such order.', status=404)
+    return JsonResponse(serialize_order(order, _order_items(order)))
@@ -0,0 +1,199 @@
+import asyncio
+import gzip
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico', '.eot', '.ttf', '.otf'}
+# Below this the headers cost more than compression saves
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Variants in order of preference, as (Accept-Encoding token, file suffix)
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+CHUNK_SIZE = 8192
+
+
+def compress_file(path):
+    """Write ``path.gz`` (and ``path.br`` when brotli is installed) if they come out smaller."""
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    written = []
+    if len(data) < MIN_COMPRESS_SIZE:
+        return written
+    variants = [('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda: brotli.compress(data, quality=11)))
+    for suffix, compress in variants:
+        compressed = compress()
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as fh:
+                fh.write(compressed)
+            written.append(path + suffix)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed filenames plus pre-built gzip/brotli copies, all made by collectstatic."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                compress_file(self.path(name))
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        content_type, _ = mimetypes.guess_type(path)
+        if content_type and (content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml')):
+            content_type += '; charset=utf-8'
+        self.immutable = immutable
+        self.headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('Cache-Control', IMMUTABLE if immutable else f'public, max-age={settings.STATIC_MAX_AGE}'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        version = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        # Only the variants collectstatic actually wrote. Each encoding is a different
+        # body, so each gets its own ETag ("...-gz", "...-br") to revalidate against
+        self.variants = [
+            (path + suffix, encoding, f'"{version}-{suffix[1:]}"')
+            for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)
+        ]
+        self.variants.append((path, None, f'"{version}"'))
+
+    def pick(self, accept_encoding):
+        """``(path, encoding, etag)`` of the best variant the client accepts."""
+        accepted = {token.split(';')[0].strip() for token in accept_encoding.split(',')}
+        for path, encoding, etag in self.variants:
+            if encoding is None or encoding in accepted:
+                return path, encoding, etag
+
+
+class ServeStatic:
+    """WSGI middleware serving STATIC_ROOT in-process, so no CDN or nginx is needed.
+
+    The file list is read once at startup. Manifest-hashed files get a one-year
+    immutable Cache-Control; anything else is cached for STATIC_MAX_AGE seconds.
+    Everything that is not a collected static file goes on to Django.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.prefix = '/' + (prefix or settings.STATIC_URL).strip('/') + '/'
+        self.files = self.scan(str(root or settings.STATIC_ROOT))
+
+    def scan(self, root):
+        files = {}
+        if not os.path.isdir(root):
+            return files
+        hashed = set()
+        manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+        if os.path.exists(manifest):
+            with open(manifest) as fh:
+                hashed = set(json.load(fh).get('paths', {}).values())
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                files[self.prefix + name] = StaticFile(path, immutable=name in hashed)
+        return files
+
+    def find(self, method, path):
+        """The StaticFile for a GET or HEAD of ``path``, or None to pass it on."""
+        if method not in ('GET', 'HEAD'):
+            return None
+        return self.files.get(path)
+
+    def respond(self, static_file, if_none_match, accept_encoding):
+        """``(status, headers, path)``; ``path`` is None when there is no body to send."""
+        path, encoding, etag = static_file.pick(accept_encoding)
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            headers = [header for header in static_file.headers if header[0] != 'Content-Type']
+            return '304 Not Modified', headers + [('ETag', etag)], None
+        headers = list(static_file.headers) + [('ETag', etag)]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(os.path.getsize(path))))
+        return '200 OK', headers, path
+
+    def __call__(self, environ, start_response):
+        static_file = self.find(environ['REQUEST_METHOD'], environ.get('PATH_INFO', ''))
+        if static_file is None:
+            return self.application(environ, start_response)
+
+        status, headers, path = self.respond(
+            static_file, environ.get('HTTP_IF_NONE_MATCH', ''), environ.get('HTTP_ACCEPT_ENCODING', ''),
+        )
+        start_response(status, headers)
+        if path is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        fh = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        return file_wrapper(fh, CHUNK_SIZE) if file_wrapper else _chunks(fh)
+
+
+class AsgiServeStatic(ServeStatic):
+    """ServeStatic for the ASGI application: the same files, headers and caching."""
+
+    async def __call__(self, scope, receive, send):
+        static_file = self.find(scope.get('method'), scope.get('path', '')) if scope['type'] == 'http' else None
+        if static_file is None:
+            return await self.application(scope, receive, send)
+
+        request_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        status, headers, path = self.respond(
+            static_file, request_headers.get('if-none-match', ''), request_headers.get('accept-encoding', ''),
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split()[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        })
+        if path is None or scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        # Read off the event loop so a slow disk does not hold up other requests
+        with open(path, 'rb') as fh:
+            while True:
+                chunk = await asyncio.to_thread(fh.read, CHUNK_SIZE)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(chunk)})
+                if not chunk:
+                    break
+
+
+def _chunks(fh):
+    with fh:
+        yield from iter(lambda: fh.read(CHUNK_SIZE), b'')
+
+
+def serve_static(application):
+    """Wrap the WSGI application with ServeStatic when SERVE_STATIC is on."""
+    if not settings.SERVE_STATIC:
+        return application
+    return ServeStatic(application)
+
+
+def serve_static_asgi(application):
+    """Wrap the ASGI application with AsgiServeStatic when SERVE_STATIC is on."""
+    if not settings.SERVE_STATIC:
+        return application
+    return AsgiServeStatic(application)
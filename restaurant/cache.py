@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Max, Sum
+
+from .models import Category, MenuItem, Review
+
+MENU_VERSION_KEY = 'restaurant:menu_version'
+HOME_DATA_TIMEOUT = 60 * 60
+
+
+def cache_is_shared():
+    """Whether every worker process reads and writes the same default cache.
+
+    Entries invalidated by other requests, like staff roles and cart counts,
+    may only outlive a request when this is true; a per-process cache would
+    keep serving them in every worker except the one that cleared them.
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def get_menu_version():
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted version never reuses stale keys
+        cache.add(MENU_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+async def aget_menu_version():
+    version = await cache.aget(MENU_VERSION_KEY)
+    if version is None:
+        await cache.aadd(MENU_VERSION_KEY, int(time.time() * 1000), None)
+        version = await cache.aget(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    # A fresh value rather than incr(), which the file cache does not make
+    # atomic across processes; any new value moves every worker off the old keys
+    version = time.time_ns()
+    cache.set(MENU_VERSION_KEY, version, None)
+    return version
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _build_home_data():
+    # Independent reads, so they are issued together rather than one after another
+    categories, menu_items, reviews, totals, first_review_at = await asyncio.gather(
+        _alist(Category.objects.all().order_by('name')),
+        _alist(
+            MenuItem.objects.filter(is_available=True)
+            .select_related('category')
+            .order_by('category__name', 'name')
+        ),
+        _alist(Review.objects.all().select_related('menu_item', 'user').order_by('-created_at')[:5]),
+        # Reads the per-item running totals instead of scanning every review
+        MenuItem.objects.aaggregate(
+            rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'), last_updated=Max('updated_at'),
+        ),
+        Review.objects.order_by('created_at').values_list('created_at', flat=True).afirst(),
+    )
+
+    # Group items up front so the template does not rescan the menu per category
+    for category in categories:
+        category.available_items = [item for item in menu_items if item.category_id == category.id]
+
+    last_modified = max(
+        (ts for ts in [totals['last_updated'], reviews[0].created_at if reviews else None] if ts),
+        default=None,
+    )
+    fingerprint = repr((
+        [(category.id, category.name) for category in categories],
+        [(item.id, item.updated_at, item.rating_sum, item.rating_count, item.image_variants) for item in menu_items],
+        [review.id for review in reviews],
+        totals, first_review_at,
+    ))
+
+    return {
+        'categories': categories,
+        'menu_items': menu_items,
+        'reviews': reviews,
+        'menu_items_count': len(menu_items),
+        'average_rating': totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 0,
+        'first_review_at': first_review_at,
+        'last_modified': last_modified,
+        'etag': hashlib.md5(fingerprint.encode()).hexdigest(),
+    }
+
+
+async def aget_home_data():
+    key = f'restaurant:home:{await aget_menu_version()}'
+    data = await cache.aget(key)
+    if data is None:
+        data = await _build_home_data()
+        await cache.aset(key, data, HOME_DATA_TIMEOUT)
+    return data
+
+
+async def aget_home_page(etag):
+    return await cache.aget(f'restaurant:home_page:{etag}')
+
+
+async def aset_home_page(etag, content):
+    await cache.aset(f'restaurant:home_page:{etag}', content, HOME_DATA_TIMEOUT)
+
+
+async def aget_menu_json(etag):
+    return await cache.aget(f'restaurant:menu_json:{etag}')
+
+
+async def aset_menu_json(etag, content):
+    await cache.aset(f'restaurant:menu_json:{etag}', content, HOME_DATA_TIMEOUT)
@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .cache import cache_is_shared
+from .counters import increment
+from .models import Cart, CartLine
+
+CART_COUNT_TIMEOUT = 60 * 60
+# Far above any real order, and well inside the quantity column's range
+MAX_QUANTITY = 999
+
+
+def _count_key(user):
+    return f'restaurant:cart_count:{user.pk}'
+
+
+def _forget_count(user):
+    cache.delete(_count_key(user))
+
+
+def _user_lines(user):
+    return CartLine.objects.filter(cart__user=user)
+
+
+def add_item(user, menu_item_id, quantity=1):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    increment(CartLine, {'cart': cart, 'menu_item_id': menu_item_id}, {'quantity': quantity})
+    _forget_count(user)
+
+
+def update_quantity(user, menu_item_id, quantity):
+    if quantity <= 0:
+        return remove_item(user, menu_item_id)
+    updated = _user_lines(user).filter(menu_item_id=menu_item_id).update(quantity=quantity)
+    _forget_count(user)
+    return bool(updated)
+
+
+def remove_item(user, menu_item_id):
+    deleted, _ = _user_lines(user).filter(menu_item_id=menu_item_id).delete()
+    _forget_count(user)
+    return bool(deleted)
+
+
+def clear(user):
+    _user_lines(user).delete()
+    _forget_count(user)
+
+
+def get_lines(user):
+    # Names, prices and images come from the menu item in the same query
+    return list(_user_lines(user).select_related('menu_item').order_by('menu_item__name'))
+
+
+def get_line_values(user):
+    # Plain dicts for the JSON API, skipping model instances altogether
+    return list(
+        _user_lines(user).order_by('menu_item__name')
+        .values('menu_item_id', 'menu_item__name', 'menu_item__price', 'menu_item__is_available', 'quantity')
+    )
+
+
+async def aget_lines(user):
+    return [line async for line in _user_lines(user).select_related('menu_item').order_by('menu_item__name')]
+
+
+def get_item_count(user):
+    # Cached only where every worker sees _forget_count; a per-process copy
+    # would go stale as soon as another worker changed the cart
+    if not cache_is_shared():
+        return _user_lines(user).aggregate(total=Sum('quantity'))['total'] or 0
+    key = _count_key(user)
+    count = cache.get(key)
+    if count is None:
+        count = _user_lines(user).aggregate(total=Sum('quantity'))['total'] or 0
+        cache.set(key, count, CART_COUNT_TIMEOUT)
+    return count
+
+
+async def aget_item_count(user):
+    if not cache_is_shared():
+        return (await _user_lines(user).aaggregate(total=Sum('quantity')))['total'] or 0
+    key = _count_key(user)
+    count = await cache.aget(key)
+    if count is None:
+        count = (await _user_lines(user).aaggregate(total=Sum('quantity')))['total'] or 0
+        await cache.aset(key, count, CART_COUNT_TIMEOUT)
+    return count
@@ -1,12 +1,27 @@
+import asyncio
+
+from .cart import aget_item_count, get_item_count
+from .roles import ais_staff_member, is_staff_member
+
 def order_count(request):
-    order = request.session.get('order', {})
-    count = 0
-    for item in order.values():
-        count += item.get('quantity', 0)
+    is_staff = is_staff_member(request.user)
     
-    is_staff = request.user.is_authenticated and (request.user.is_staff or request.user.groups.filter(name='Staff').exists())
+    # Staff never see the order badge, so skip the lookup for them
+    if not request.user.is_authenticated or is_staff:
+        count = 0
+    elif hasattr(request, '_cart_item_count'):
+        count = request._cart_item_count
+    else:
+        count = get_item_count(request.user)
     
     return {
         'order_count': count,
         'is_staff_member': is_staff
     }
+
+async def prime_order_count(request):
+    # Async views resolve these up front so rendering never queries from the event loop
+    if request.user.is_authenticated:
+        _, request._cart_item_count = await asyncio.gather(
+            ais_staff_member(request.user), aget_item_count(request.user),
+        )
@@ -0,0 +1,21 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def increment(model, key, deltas, defaults=None):
+    """Add ``deltas`` to the ``model`` row matching ``key``, creating the row on first use.
+
+    ``defaults`` is a callable returning the other fields of a new row, so it
+    only runs when there is no row yet. A row created by another request in
+    between is not an error; the update is simply run again.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    rows = model.objects.filter(**key)
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas, **(defaults() if defaults else {}))
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(**changes)
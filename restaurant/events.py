@@ -0,0 +1,140 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DashboardEvent, Order
+
+POLL_INTERVAL = 1.0
+KEEPALIVE_SECONDS = 15
+RETENTION = timedelta(days=1)
+PRUNE_EVERY = 500
+
+
+def publish(kind, payload):
+    # Written inside a longer transaction the row could commit after the poller
+    # has moved past its id and never be streamed, so it waits for the commit
+    transaction.on_commit(lambda: _record(kind, payload))
+
+
+def _record(kind, payload):
+    event = DashboardEvent.objects.create(kind=kind, payload=payload)
+    if event.pk % PRUNE_EVERY == 0:
+        DashboardEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+
+
+def publish_order_created(order_id):
+    order = Order.objects.filter(pk=order_id).prefetch_related('items__menu_item').first()
+    if order is None:
+        return
+    publish('order_created', {
+        'id': order.id,
+        'status': order.status,
+        'order_date': order.order_date.isoformat(),
+        'customer_name': order.customer_name,
+        'customer_email': order.customer_email,
+        'customer_phone': order.customer_phone,
+        'total_amount': str(order.total_amount),
+        'items': [{'quantity': item.quantity, 'name': item.menu_item.name} for item in order.items.all()],
+    })
+
+
+def publish_reservation_created(reservation):
+    publish('reservation_created', {
+        'id': reservation.id,
+        'name': reservation.name,
+        'email': reservation.email,
+        'phone': reservation.phone,
+        'date': str(reservation.date),
+        'time': str(reservation.time)[:5],
+        'number_of_guests': reservation.number_of_guests,
+        'special_requests': reservation.special_requests,
+        'created_at': reservation.created_at.isoformat(),
+    })
+
+
+def latest_event_id():
+    return DashboardEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+async def events_after(event_id, limit=500):
+    return [
+        event async for event in
+        DashboardEvent.objects.filter(id__gt=event_id).order_by('id').values('id', 'kind', 'payload')[:limit]
+    ]
+
+
+class Broadcaster:
+    """One database poller per process, fanned out to every open stream."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+        self.last_id = None
+
+    def subscribe(self, since):
+        queue = asyncio.Queue(maxsize=200)
+        self.subscribers.add(queue)
+        if self.last_id is None:
+            self.last_id = since
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.poll())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            # The next subscriber replays from its own position, so start fresh
+            self.last_id = None
+
+    async def poll(self):
+        while self.subscribers:
+            for event in await events_after(self.last_id):
+                self.last_id = event['id']
+                for queue in list(self.subscribers):
+                    try:
+                        queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        # A stalled client is disconnected instead of buffering without bound;
+                        # EventSource reconnects with Last-Event-ID and replays what it missed
+                        self.subscribers.discard(queue)
+                        while not queue.empty():
+                            queue.get_nowait()
+                        queue.put_nowait(None)
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+broadcaster = Broadcaster()
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event['payload'])}\n\n"
+
+
+async def event_stream(since):
+    # Subscribe before replaying so nothing published in between is missed
+    queue = broadcaster.subscribe(since)
+    try:
+        last_sent = since
+        # Replay what the client missed before joining the live feed
+        for event in await events_after(since):
+            last_sent = event['id']
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                break
+            if event['id'] > last_sent:
+                last_sent = event['id']
+                yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,99 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+ORDER_COLUMNS = [
+    ('order_id', 'id'),
+    ('order_date', 'order_date'),
+    ('status', 'status'),
+    ('customer_name', 'customer_name'),
+    ('customer_email', 'customer_email'),
+    ('customer_phone', 'customer_phone'),
+    ('total_amount', 'total_amount'),
+    ('item', 'items__menu_item__name'),
+    ('quantity', 'items__quantity'),
+    ('unit_price', 'items__price'),
+]
+RESERVATION_COLUMNS = [
+    ('reservation_id', 'id'),
+    ('date', 'date'),
+    ('time', 'time'),
+    ('name', 'name'),
+    ('email', 'email'),
+    ('phone', 'phone'),
+    ('guests', 'number_of_guests'),
+    ('confirmed', 'confirmed'),
+    ('cancelled', 'cancelled'),
+    ('special_requests', 'special_requests'),
+    ('created_at', 'created_at'),
+]
+
+
+class _Echo:
+    # csv.writer only needs write(); returning the line lets us yield it straight away
+    def write(self, value):
+        return value
+
+
+def filter_orders(queryset, start=None, end=None, status=None):
+    # Compare against datetimes rather than order_date__date so the index stays usable
+    if start:
+        queryset = queryset.filter(order_date__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        queryset = queryset.filter(order_date__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def filter_reservations(queryset, start=None, end=None, status=None):
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    if status == 'cancelled':
+        queryset = queryset.filter(cancelled=True)
+    elif status == 'confirmed':
+        queryset = queryset.filter(confirmed=True, cancelled=False)
+    elif status == 'pending':
+        queryset = queryset.filter(confirmed=False, cancelled=False)
+    return queryset
+
+
+def order_rows(queryset):
+    """One row per order item; orders without items still get a single row."""
+    return queryset.order_by('id', 'items__id').values_list(*[field for _, field in ORDER_COLUMNS])
+
+
+def reservation_rows(queryset):
+    return queryset.order_by('date', 'time', 'id').values_list(*[field for _, field in RESERVATION_COLUMNS])
+
+
+def _csv_lines(rows, headers):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(rows, headers):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream(rows, columns, fmt, filename):
+    """Stream a values_list queryset without loading it into memory."""
+    headers = [name for name, _ in columns]
+    # iterator() reads in chunks (server-side cursors on Postgres) instead of caching every row
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+    lines = _csv_lines(rows, headers) if fmt == 'csv' else _ndjson_lines(rows, headers)
+    response = StreamingHttpResponse(lines, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,90 @@
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Order, OrderItem, Reservation, Review
+from .pagination import after_cursor
+
+# Rows per profile section, on the page and per "load more"
+PAGE_SIZE = 10
+
+# Newest first; the id breaks ties so the cursor always points at exactly one row
+ORDER_ORDERING = ('-order_date', '-id')
+RESERVATION_ORDERING = ('-date', '-time', '-id')
+REVIEW_ORDERING = ('-created_at', '-id')
+
+
+def orders(user):
+    # A subquery rather than a join: a GROUP BY would sum every order the user
+    # ever placed before the LIMIT applies, this only sums the page
+    item_counts = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(total=Sum('quantity')).values('total')
+    return Order.objects.filter(user=user).only('id', 'order_date', 'total_amount', 'status').annotate(
+        item_count=Coalesce(Subquery(item_counts), 0)
+    )
+
+
+def reservations(user):
+    return Reservation.objects.filter(user=user).only(
+        'id', 'name', 'date', 'time', 'number_of_guests', 'phone', 'special_requests', 'confirmed', 'cancelled'
+    )
+
+
+def reviews(user):
+    return Review.objects.filter(user=user).select_related('menu_item').only(
+        'id', 'rating', 'comment', 'created_at', 'menu_item__name'
+    )
+
+
+def reservation_status(reservation):
+    if reservation.cancelled:
+        return 'Cancelled'
+    return 'Confirmed' if reservation.confirmed else 'Pending'
+
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'order_date': order.order_date.isoformat(),
+        'total_amount': str(order.total_amount),
+        'status': order.status,
+        'item_count': order.item_count,
+    }
+
+
+def serialize_reservation(reservation):
+    return {
+        'id': reservation.id,
+        'name': reservation.name,
+        'date': reservation.date.isoformat(),
+        'time': reservation.time.strftime('%H:%M'),
+        'number_of_guests': reservation.number_of_guests,
+        'phone': reservation.phone,
+        'special_requests': reservation.special_requests,
+        'status': reservation_status(reservation),
+    }
+
+
+def serialize_review(review):
+    return {
+        'id': review.id,
+        'menu_item': review.menu_item.name if review.menu_item else None,
+        'rating': review.rating,
+        'comment': review.comment,
+        'created_at': review.created_at.isoformat(),
+    }
+
+
+# Each profile section as (queryset for a user, keyset ordering, JSON serializer)
+SECTIONS = {
+    'orders': (orders, ORDER_ORDERING, serialize_order),
+    'reservations': (reservations, RESERVATION_ORDERING, serialize_reservation),
+    'reviews': (reviews, REVIEW_ORDERING, serialize_review),
+}
+
+
+def page_queryset(section, user, cursor=None):
+    """The rows for one page of ``section``: PAGE_SIZE plus one to tell if there is more.
+
+    Raises InvalidCursor for a cursor that was not made by cut_page.
+    """
+    queryset, ordering, _ = SECTIONS[section]
+    return after_cursor(queryset(user), ordering, cursor)[:PAGE_SIZE + 1]
@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from .cache import bump_menu_version
+from .models import MenuItem
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+# Resizing is CPU-bound but Pillow releases the GIL, so a small pool keeps it off the request
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'MENU_IMAGE_WORKERS', 2), thread_name_prefix='menu-images')
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(buffer, fmt, quality=82, optimize=True, progressive=True)
+    else:
+        image.save(buffer, fmt, quality=80, method=4)
+    return buffer.getvalue()
+
+
+def build_variants(image_file, name):
+    """Write resized copies of an image and return their descriptions."""
+    with Image.open(image_file) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+        stem = os.path.splitext(os.path.basename(name))[0]
+        widths = [w for w in settings.MENU_IMAGE_WIDTHS if w < original.width] or [original.width]
+        variants = []
+        for width in widths:
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height), Image.LANCZOS)
+            for ext, fmt in VARIANT_FORMATS.items():
+                data = _encode(resized, fmt)
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                path = default_storage.save(f'menu_images/variants/{stem}-{width}w-{digest}.{ext}', ContentFile(data))
+                variants.append({'name': path, 'format': ext, 'width': width, 'height': height})
+    return variants
+
+
+def delete_variants(variants):
+    for variant in variants:
+        default_storage.delete(variant['name'])
+
+
+def generate_variants(menu_item_id):
+    item = MenuItem.objects.filter(pk=menu_item_id).only('id', 'image', 'image_variants').first()
+    if item is None:
+        return []
+
+    variants = []
+    if item.image:
+        with item.image.open('rb') as image_file:
+            variants = build_variants(image_file, item.image.name)
+
+    # Only swap in the new set if the image was not replaced again meanwhile
+    current = MenuItem.objects.filter(pk=item.pk)
+    if item.image:
+        current = current.filter(image=item.image.name)
+    else:
+        current = current.filter(Q(image='') | Q(image__isnull=True))
+    updated = current.update(image_variants=variants)
+    if updated:
+        delete_variants(item.image_variants)
+        bump_menu_version()
+    else:
+        delete_variants(variants)
+    return variants
+
+
+def _run(menu_item_id):
+    try:
+        return generate_variants(menu_item_id)
+    except Exception:
+        logger.exception('Could not build image variants for menu item %s', menu_item_id)
+    finally:
+        connection.close()
+
+
+def schedule_variants(menu_item_id):
+    return _executor.submit(_run, menu_item_id)
@@ -0,0 +1,123 @@
+import logging
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# A running job older than this is assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+
+handlers = {}
+
+
+def task(name):
+    def register(func):
+        handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, key=None, delay=None, max_attempts=5):
+    """Queue a job, or return the existing one when ``key`` was already used."""
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'max_attempts': max_attempts,
+        'run_after': timezone.now() + (delay or timedelta()),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=key)
+
+
+def numbered_keys(prefixes):
+    """A key for each of ``prefixes``: the prefix and how many of its keys are already in use.
+
+    For changes that may legitimately happen again, such as an order moving
+    between the same two statuses twice. Two writers racing on the same change
+    count the same number, so the second is still skipped.
+    """
+    prefixes = list(prefixes)
+    if not prefixes:
+        return []
+    used = Counter(
+        key.rsplit('-', 1)[0] for key in Job.objects.filter(
+            Q(*[Q(idempotency_key__startswith=f'{prefix}-') for prefix in prefixes], _connector=Q.OR)
+        ).values_list('idempotency_key', flat=True)
+    )
+    return [f'{prefix}-{used[prefix]}' for prefix in prefixes]
+
+
+def enqueue_many(name, jobs, max_attempts=5):
+    """Queue ``(payload, key)`` pairs in one insert; keys that were already used are skipped."""
+    run_after = timezone.now()
+    Job.objects.bulk_create([
+        Job(name=name, payload=payload, idempotency_key=key, max_attempts=max_attempts, run_after=run_after)
+        for payload, key in jobs
+    ], ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_next():
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        Q(status=Job.STATUS_QUEUED, run_after__lte=now)
+        | Q(status=Job.STATUS_RUNNING, locked_at__lt=now - STALE_AFTER)
+    ).order_by('run_after', 'id').values_list('id', 'status')[:10]
+    for job_id, status in candidates:
+        # The status check makes the claim safe when several workers race for a job
+        claimed = Job.objects.filter(pk=job_id, status=status).update(
+            status=Job.STATUS_RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    handler = handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job "{job.name}"')
+        handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.STATUS_QUEUED
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+            logger.warning('Job %s failed (attempt %d), retrying at %s', job, job.attempts, job.run_after)
+        else:
+            job.status = Job.STATUS_FAILED
+            logger.error('Job %s failed permanently after %d attempts', job, job.attempts)
+    else:
+        job.status = Job.STATUS_DONE
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_after', 'locked_at', 'last_error', 'updated_at'])
+    return job
+
+
+def run_pending(limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
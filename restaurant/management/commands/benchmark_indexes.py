@@ -0,0 +1,78 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from restaurant.models import MenuItem, Order, Reservation, Review
+
+INDEXED_MODELS = [MenuItem, Order, Reservation, Review]
+
+class Command(BaseCommand):
+    help = 'Seeds bulk data and reports query plans and timings for the hot queries, with and without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100000, help='Orders to seed')
+        parser.add_argument('--reviews', type=int, default=100000, help='Reviews to seed')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query when timing')
+        parser.add_argument('--skip-seed', action='store_true', help='Use the data already in the database')
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            call_command(
+                'seed_data', orders=options['orders'], reviews=options['reviews'],
+                reservations=options['orders'] // 10, menu_items=200, users=500, stdout=self.stdout,
+            )
+
+        customer = User.objects.filter(username__startswith='bench-', is_staff=False).order_by('id').first()
+        queries = {
+            'home menu': lambda: MenuItem.objects.filter(is_available=True).order_by('category__name', 'name'),
+            'home reviews': lambda: Review.objects.order_by('-created_at')[:5],
+            'dashboard orders': lambda: Order.objects.filter(status__in=['Pending', 'Processing']).order_by('-order_date')[:25],
+            'dashboard reservations': lambda: Reservation.objects.filter(confirmed=False).order_by('date', 'time')[:25],
+            'profile orders': lambda: Order.objects.filter(user=customer).order_by('-order_date')[:25],
+            'profile reviews': lambda: Review.objects.filter(user=customer).order_by('-created_at')[:25],
+        }
+
+        with_indexes = self.measure(queries, options['repeat'])
+        with self.indexes_dropped():
+            without_indexes = self.measure(queries, options['repeat'])
+
+        for name in queries:
+            before_plan, before_ms = without_indexes[name]
+            after_plan, after_ms = with_indexes[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  without indexes: {before_ms:.2f}ms')
+            self.stdout.write(self.indent(before_plan))
+            self.stdout.write(f'  with indexes:    {after_ms:.2f}ms')
+            self.stdout.write(self.indent(after_plan))
+
+    def indent(self, plan):
+        return '\n'.join(f'      {line}' for line in plan.splitlines())
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, build in queries.items():
+            plan = build().explain()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (plan, statistics.median(timings))
+        return results
+
+    @contextmanager
+    def indexes_dropped(self):
+        indexes = [(model, index) for model in INDEXED_MODELS for index in model._meta.indexes]
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        try:
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
@@ -0,0 +1,141 @@
+import importlib.util
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from .run_benchmarks import percentile
+
+SERVERS = {
+    # Threaded sync workers, so WSGI is not limited to one request per process
+    'wsgi': ('gunicorn', lambda port, workers: [
+        'skyfoodcorner.wsgi', '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', '8',
+    ]),
+    'asgi': ('uvicorn', lambda port, workers: [
+        'skyfoodcorner.asgi:application', '--port', str(port), '--workers', str(workers), '--no-access-log',
+    ]),
+}
+PAGES = {
+    'home': ('/', False),
+    'order_view': ('/order/', True),
+    'profile': ('/profile/', True),
+    'submit_review': ('/review/', True),
+}
+
+
+class Command(BaseCommand):
+    help = 'Serves the site under gunicorn (WSGI) and uvicorn (ASGI) and compares them at high concurrency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', choices=SERVERS, help='Limit to these servers (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=64, help='Concurrent connections per page')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per page')
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        servers = options['server'] or list(SERVERS)
+        missing = [SERVERS[name][0] for name in servers if importlib.util.find_spec(SERVERS[name][0]) is None]
+        if missing:
+            raise CommandError(f'Install {" and ".join(missing)} to run this benchmark.')
+        user = User.objects.filter(username__startswith='bench-', is_staff=False).order_by('id').first()
+        if user is None:
+            raise CommandError('Not enough benchmark data, run "manage.py seed_data" first.')
+
+        cookie = self.session_cookie(user)
+        report = {
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'workers': options['workers'],
+            'servers': {},
+        }
+        for name in servers:
+            module, server_args = SERVERS[name]
+            base_url = f'http://127.0.0.1:{options["port"]}'
+            process = subprocess.Popen(
+                [sys.executable, '-m', module, *server_args(options['port'], options['workers'])],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                self.wait_until_ready(base_url, process)
+                report['servers'][name] = {
+                    page: self.run_page(base_url + path, cookie if needs_login else None, options)
+                    for page, (path, needs_login) in PAGES.items()
+                }
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def session_cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def wait_until_ready(self, base_url, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Server exited with status {process.returncode}.')
+            try:
+                urllib.request.urlopen(base_url + '/', timeout=1).read()
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'Server did not answer on {base_url} within {timeout}s.')
+
+    def run_page(self, url, cookie, options):
+        request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+        samples = []
+        lock = threading.Lock()
+        remaining = [options['requests']]
+
+        def worker():
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        return
+                    remaining[0] -= 1
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=60) as response:
+                        response.read()
+                        ok = response.status < 400
+                except (urllib.error.URLError, ConnectionError):
+                    ok = False
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with lock:
+                    samples.append((elapsed_ms, ok))
+
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - started
+
+        latencies = sorted(sample[0] for sample in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if not sample[1]),
+            'throughput_per_s': round(len(samples) / wall_time, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+        }
@@ -0,0 +1,92 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from restaurant import cart
+from restaurant.models import Category, MenuItem, Order
+
+class Command(BaseCommand):
+    help = 'Runs concurrent checkouts against the configured database and reports throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent customers')
+        parser.add_argument('--orders', type=int, default=25, help='Orders placed by each customer')
+        parser.add_argument('--lines', type=int, default=5, help='Menu items in each order')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users, menu and orders')
+
+    def handle(self, *args, **options):
+        category, _ = Category.objects.get_or_create(name='Load Test')
+        items = [
+            MenuItem.objects.get_or_create(
+                category=category, name=f'Load Test Item {i}',
+                defaults={'description': 'Generated by loadtest_checkout', 'price': '5.00'},
+            )[0]
+            for i in range(options['lines'])
+        ]
+        users = [
+            User.objects.get_or_create(username=f'loadtest-{i}')[0]
+            for i in range(options['workers'])
+        ]
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def customer(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                for _ in range(options['orders']):
+                    for item in items:
+                        cart.add_item(user, item.id)
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(reverse('checkout'), {
+                            'customer_name': user.username,
+                            'customer_email': f'{user.username}@example.com',
+                        })
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if response.status_code == 302:
+                            latencies.append(elapsed)
+                        else:
+                            errors.append(f'HTTP {response.status_code}')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=customer, args=(user,)) for user in users]
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall_time = time.perf_counter() - started
+
+        self.stdout.write(f'Database: {connection.vendor} ({connection.settings_dict["NAME"]})')
+        self.stdout.write(f'Workers: {options["workers"]}, lines per order: {options["lines"]}')
+        self.stdout.write(f'Orders placed: {len(latencies)}, failed: {len(errors)}')
+        self.stdout.write(f'Throughput: {len(latencies) / wall_time:.1f} orders/s over {wall_time:.2f}s')
+        if latencies:
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+            self.stdout.write(
+                f'Checkout latency: median {statistics.median(latencies) * 1000:.1f}ms, '
+                f'p95 {p95 * 1000:.1f}ms'
+            )
+        for error in sorted(set(errors)):
+            self.stdout.write(self.style.ERROR(f'{errors.count(error)} x {error}'))
+
+        if not options['keep']:
+            Order.objects.filter(user__in=users).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            category.delete()
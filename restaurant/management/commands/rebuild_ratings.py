@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from restaurant.cache import bump_menu_version
+from restaurant.models import MenuItem, Review
+
+class Command(BaseCommand):
+    help = 'Recalculates the denormalized rating totals on every menu item'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of menu items updated per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        totals = {
+            row['menu_item']: (row['rating_sum'], row['rating_count'])
+            for row in Review.objects.filter(menu_item__isnull=False)
+            .order_by()
+            .values('menu_item')
+            .annotate(rating_sum=Sum('rating'), rating_count=Count('id'))
+        }
+
+        fixed = 0
+        items = MenuItem.objects.only('id', 'rating_sum', 'rating_count').order_by('id')
+        batch = []
+        for item in items.iterator(chunk_size=batch_size):
+            rating_sum, rating_count = totals.get(item.id, (0, 0))
+            if (item.rating_sum, item.rating_count) != (rating_sum, rating_count):
+                item.rating_sum = rating_sum
+                item.rating_count = rating_count
+                batch.append(item)
+            if len(batch) >= batch_size:
+                fixed += self._flush(batch)
+                batch = []
+        fixed += self._flush(batch)
+
+        if fixed:
+            bump_menu_version()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating totals, {fixed} menu item(s) corrected'))
+
+    def _flush(self, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            MenuItem.objects.bulk_update(batch, ['rating_sum', 'rating_count'])
+        return len(batch)
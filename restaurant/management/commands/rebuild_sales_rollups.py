@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from restaurant.analytics import rebuild
+from restaurant.models import Order, Review
+
+class Command(BaseCommand):
+    help = 'Recalculates the daily sales rollups from the orders and reviews tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD), defaults to the oldest order or review')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--days', type=int, default=31, help='Number of days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        start = self._date(options['start'])
+        end = self._date(options['end']) or timezone.localdate()
+        if start is None:
+            oldest = [
+                Order.objects.aggregate(first=Min('order_date'))['first'],
+                Review.objects.aggregate(first=Min('created_at'))['first'],
+            ]
+            oldest = [timezone.localdate(value) for value in oldest if value]
+            if not oldest:
+                self.stdout.write(self.style.SUCCESS('Rebuilt sales rollups, 0 day(s) with sales'))
+                return
+            start = min(oldest)
+            latest = Order.objects.aggregate(last=Max('order_date'))['last']
+            if options['end'] is None and latest:
+                end = max(end, timezone.localdate(latest))
+        if start > end:
+            raise CommandError('--start must not be after --end.')
+
+        days = items = 0
+        # Small windows keep each delete/insert transaction short on a live database
+        while start <= end:
+            window_end = min(start + timedelta(days=options['days'] - 1), end)
+            rebuilt_days, rebuilt_items = rebuild(start, window_end)
+            days += rebuilt_days
+            items += rebuilt_items
+            start = window_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups, {days} day(s) with sales, {items} item row(s)'))
+
+    def _date(self, value):
+        if value is None:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'"{value}" is not a YYYY-MM-DD date.')
+        return parsed
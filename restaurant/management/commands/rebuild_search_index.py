@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from restaurant.cache import bump_menu_version
+from restaurant.models import MenuItem
+from restaurant.search import backend, index_items
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text menu search index from the menu items table'
+
+    def handle(self, *args, **options):
+        if backend() is None:
+            self.stdout.write(self.style.WARNING('This database has no search index; search falls back to a name scan'))
+            return
+        with transaction.atomic():
+            index_items()
+        # New vocabulary for typo correction
+        bump_menu_version()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search index, {MenuItem.objects.count()} menu item(s)'))
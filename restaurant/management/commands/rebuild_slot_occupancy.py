@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from restaurant.models import Reservation, SlotOccupancy, TimeSlot
+
+class Command(BaseCommand):
+    help = 'Recalculates the per-slot seat counts from the reservations table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of slot rows inserted per query')
+
+    def handle(self, *args, **options):
+        seats = dict(TimeSlot.objects.values_list('start', 'seats'))
+        rows = [
+            SlotOccupancy(date=row['date'], start=row['time'], capacity=seats.get(row['time'], 0), seats_booked=row['guests'])
+            for row in Reservation.objects.filter(cancelled=False)
+            .order_by()
+            .values('date', 'time')
+            .annotate(guests=Sum('number_of_guests'))
+        ]
+        with transaction.atomic():
+            SlotOccupancy.objects.all().delete()
+            SlotOccupancy.objects.bulk_create(rows, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt slot occupancy, {len(rows)} slot(s) in use'))
@@ -0,0 +1,169 @@
+import json
+import random
+import subprocess
+import threading
+import time
+from datetime import date, timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from restaurant.models import MenuItem
+
+SCENARIOS = ['home', 'order_flow', 'reservation', 'staff_dashboard', 'menu_search']
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, int(round(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[rank]
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def request(self, client, step, method, url, data=None):
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            response = getattr(client, method)(url, data or {})
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.samples.setdefault(step, []).append((elapsed_ms, queries[0], response.status_code < 400))
+        return response
+
+    def report(self):
+        steps = {}
+        for step, samples in self.samples.items():
+            latencies = sorted(sample[0] for sample in samples)
+            steps[step] = {
+                'requests': len(samples),
+                'errors': sum(1 for sample in samples if not sample[2]),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'queries_per_request': round(sum(sample[1] for sample in samples) / len(samples), 2),
+            }
+        return steps
+
+class Command(BaseCommand):
+    help = 'Drives the main customer and staff flows concurrently and reports latency, queries and throughput as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients per scenario')
+        parser.add_argument('--iterations', type=int, default=50, help='Scenario runs per client')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Limit to these scenarios (repeatable)')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        customers = list(User.objects.filter(username__startswith='bench-', is_staff=False).order_by('id')[:options['concurrency']])
+        staff = User.objects.filter(username='bench-staff').first()
+        menu_ids = list(MenuItem.objects.filter(is_available=True).values_list('id', flat=True))
+        if len(customers) < options['concurrency'] or staff is None or not menu_ids:
+            raise CommandError('Not enough benchmark data, run "manage.py seed_data" first.')
+
+        runners = {
+            'home': self.run_home,
+            'order_flow': self.run_order_flow,
+            'reservation': self.run_reservation,
+            'staff_dashboard': self.run_staff_dashboard,
+            'menu_search': self.run_menu_search,
+        }
+        report = {
+            'commit': self.git_commit(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'iterations': options['iterations'],
+            'scenarios': {},
+        }
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name in options['scenario'] or SCENARIOS:
+                cache.clear()
+                recorder = Recorder()
+                users = [staff] * options['concurrency'] if name == 'staff_dashboard' else customers
+                threads = [
+                    threading.Thread(
+                        target=self.worker,
+                        args=(runners[name], recorder, user, menu_ids, options['iterations'], options['seed'] + i),
+                    )
+                    for i, user in enumerate(users)
+                ]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                wall_time = time.perf_counter() - started
+                runs = options['concurrency'] * options['iterations']
+                report['scenarios'][name] = {
+                    'throughput_per_s': round(runs / wall_time, 2),
+                    'wall_time_s': round(wall_time, 3),
+                    'steps': recorder.report(),
+                }
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def worker(self, runner, recorder, user, menu_ids, iterations, seed):
+        rng = random.Random(seed)
+        client = Client()
+        client.force_login(user)
+        try:
+            for _ in range(iterations):
+                runner(client, recorder, rng, menu_ids)
+        finally:
+            connection.close()
+
+    def run_home(self, client, recorder, rng, menu_ids):
+        client.logout()
+        recorder.request(client, 'home', 'get', reverse('home'))
+
+    def run_order_flow(self, client, recorder, rng, menu_ids):
+        for item_id in rng.sample(menu_ids, 3):
+            recorder.request(client, 'add_to_order', 'post', reverse('add_to_order', args=[item_id]))
+        recorder.request(client, 'order_view', 'get', reverse('order_view'))
+        recorder.request(client, 'checkout', 'post', reverse('checkout'), {
+            'customer_name': 'Bench Customer', 'customer_email': 'bench@example.com',
+        })
+
+    def run_reservation(self, client, recorder, rng, menu_ids):
+        recorder.request(client, 'reservation_form', 'get', reverse('reservation_view'))
+        recorder.request(client, 'reservation_submit', 'post', reverse('reservation_view'), {
+            'name': 'Bench Guest', 'email': 'bench@example.com',
+            'date': (date.today() + timedelta(days=rng.randint(1, 30))).isoformat(),
+            'time': f'{rng.randint(11, 22)}:00', 'number_of_guests': rng.randint(1, 8),
+        })
+
+    def run_staff_dashboard(self, client, recorder, rng, menu_ids):
+        recorder.request(client, 'staff_dashboard', 'get', reverse('staff_dashboard'))
+
+    def run_menu_search(self, client, recorder, rng, menu_ids):
+        number = rng.randint(0, 1999)
+        # A prefix, a full name and a typo, against the seeded "Bench Item N" menu
+        for query in ('ben', f'bench item {number}', f'bnech itme {number}'):
+            recorder.request(client, 'menu_search', 'get', reverse('menu_search'), {'q': query})
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
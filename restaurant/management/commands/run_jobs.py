@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from restaurant.jobs import run_pending
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (confirmation emails and other post-request work)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run everything that is due, then exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Job worker started')
+        try:
+            while True:
+                processed = run_pending()
+                if processed:
+                    self.stdout.write(f'Processed {processed} job(s)')
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+                # Long-running worker: drop connections that died or aged out between polls
+                close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write('Job worker stopped')
@@ -0,0 +1,135 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from restaurant.cache import bump_menu_version
+from restaurant.models import Category, MenuItem, Order, OrderItem, Reservation, Review
+
+BATCH_SIZE = 2000
+CATEGORY_NAMES = [
+    'Coffee', 'Tea', 'Smoothies', 'Breakfast', 'Sandwiches', 'Burgers',
+    'Pizza', 'Pasta', 'Salads', 'Soups', 'Desserts', 'Bakery',
+]
+ORDER_STATUSES = ['Completed'] * 18 + ['Cancelled', 'Pending', 'Processing']
+
+@contextmanager
+def without_auto_now(model, field_name):
+    # Lets seeded rows carry spread-out timestamps instead of "now"
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+class Command(BaseCommand):
+    help = 'Bulk-inserts a realistic menu, customers, orders, reservations and reviews for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=200000)
+        parser.add_argument('--reservations', type=int, default=20000)
+        parser.add_argument('--reviews', type=int, default=200000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+
+        User.objects.bulk_create(
+            [User(username=f'bench-{i}', email=f'bench-{i}@example.com') for i in range(options['users'])],
+            ignore_conflicts=True,
+        )
+        staff, created = User.objects.get_or_create(username='bench-staff', defaults={'is_staff': True})
+        if created:
+            staff.set_password('bench-staff')
+            staff.save()
+        users = list(User.objects.filter(username__startswith='bench-').exclude(pk=staff.pk))
+
+        categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES]
+        MenuItem.objects.bulk_create([
+            MenuItem(
+                category=categories[i % len(categories)], name=f'Bench Item {i}',
+                description='Seeded for benchmarking', price=Decimal(rng.randint(200, 2500)) / 100,
+                is_available=rng.random() < 0.9,
+            )
+            for i in range(options['menu_items'])
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        items = list(MenuItem.objects.filter(name__startswith='Bench Item ').only('id', 'price'))
+
+        self.seed_orders(rng, now, users, items, options['orders'])
+
+        with transaction.atomic():
+            Reservation.objects.bulk_create([
+                Reservation(
+                    user=rng.choice(users), name='Bench Guest', email='bench@example.com',
+                    date=(now + timedelta(days=rng.randint(-365, 30))).date(),
+                    time=f'{rng.randint(11, 22)}:{rng.choice(["00", "30"])}',
+                    number_of_guests=rng.randint(1, 8), confirmed=rng.random() < 0.95,
+                )
+                for _ in range(options['reservations'])
+            ], batch_size=BATCH_SIZE)
+
+        self.seed_reviews(rng, now, users, items, options['reviews'])
+
+        # Bulk inserts skip the model signals, so rebuild what they maintain
+        call_command('rebuild_ratings', stdout=self.stdout)
+        call_command('rebuild_slot_occupancy', stdout=self.stdout)
+        call_command('rebuild_sales_rollups', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        if connection.vendor in ('sqlite', 'postgresql'):
+            # Fresh table statistics for the query planner and the admin's estimated counts
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        bump_menu_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(items)} menu items, {len(users)} customers, {options["orders"]} orders, '
+            f'{options["reservations"]} reservations and up to {options["reviews"]} reviews'
+        ))
+
+    def seed_orders(self, rng, now, users, items, count):
+        with without_auto_now(Order, 'order_date'):
+            for start in range(0, count, BATCH_SIZE):
+                orders = []
+                lines = []
+                for n in range(start, min(start + BATCH_SIZE, count)):
+                    chosen = rng.sample(items, rng.randint(1, 4))
+                    quantities = [rng.randint(1, 3) for _ in chosen]
+                    orders.append(Order(
+                        user=rng.choice(users), order_date=now - timedelta(minutes=n * 3),
+                        total_amount=sum(item.price * qty for item, qty in zip(chosen, quantities)),
+                        status=rng.choice(ORDER_STATUSES),
+                        customer_name='Bench Customer', customer_email='bench@example.com',
+                    ))
+                    lines.append(list(zip(chosen, quantities)))
+                with transaction.atomic():
+                    Order.objects.bulk_create(orders)
+                    OrderItem.objects.bulk_create([
+                        OrderItem(order=order, menu_item=item, quantity=qty, price=item.price)
+                        for order, order_lines in zip(orders, lines)
+                        for item, qty in order_lines
+                    ], batch_size=BATCH_SIZE)
+
+    def seed_reviews(self, rng, now, users, items, count):
+        # A customer reviews each item at most once
+        count = min(count, len(users) * len(items))
+        pairs = set()
+        while len(pairs) < count:
+            pairs.add((rng.randrange(len(users)), rng.randrange(len(items))))
+        pairs = sorted(pairs)
+        rng.shuffle(pairs)
+        with without_auto_now(Review, 'created_at'), transaction.atomic():
+            Review.objects.bulk_create([
+                Review(
+                    user=users[u], menu_item=items[i], rating=rng.choice([3, 4, 4, 5, 5, 5, 2, 1]),
+                    created_at=now - timedelta(minutes=n * 3),
+                )
+                for n, (u, i) in enumerate(pairs)
+            ], batch_size=BATCH_SIZE, ignore_conflicts=True)
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Most recent request profiles, newest last
+profiles = deque(maxlen=getattr(settings, 'PROFILE_BUFFER_SIZE', 500))
+_profiles_lock = threading.Lock()
+
+_current = ContextVar('restaurant_request_profile', default=None)
+_template_render = Template.render
+
+
+def _timed_render(self, context):
+    profile = _current.get()
+    if profile is None or profile['template_depth']:
+        return _template_render(self, context)
+    # Only the outermost template is timed, includes are part of it
+    profile['template_depth'] += 1
+    started = time.perf_counter()
+    try:
+        return _template_render(self, context)
+    finally:
+        profile['template_ms'] += (time.perf_counter() - started) * 1000
+        profile['template_depth'] -= 1
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILE_REQUESTS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'PROFILE_DUPLICATE_THRESHOLD', 3)
+        Template.render = _timed_render
+
+    def __call__(self, request):
+        profile = {'queries': Counter(), 'db_ms': 0.0, 'template_ms': 0.0, 'template_depth': 0}
+        token = _current.set(profile)
+
+        def record_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile['db_ms'] += (time.perf_counter() - started) * 1000
+                profile['queries'][sql] += 1
+
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(record_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        # SQL arrives with placeholders, so repeats of one statement share a signature
+        duplicates = [
+            {'sql': sql, 'count': count}
+            for sql, count in profile['queries'].most_common()
+            if count >= self.duplicate_threshold
+        ]
+        for duplicate in duplicates:
+            logger.warning('Repeated query in %s (%d times): %s', view, duplicate['count'], duplicate['sql'])
+
+        query_count = sum(profile['queries'].values())
+        with _profiles_lock:
+            profiles.append({
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(profile['db_ms'], 2),
+                'template_ms': round(profile['template_ms'], 2),
+                'queries': query_count,
+                'duplicates': duplicates,
+            })
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={profile["db_ms"]:.1f};desc="{query_count} queries"',
+            f'tpl;dur={profile["template_ms"]:.1f}',
+        ])
+        return response
+
+
+def summarize_profiles():
+    with _profiles_lock:
+        recent = list(profiles)
+
+    views = {}
+    for entry in recent:
+        views.setdefault(entry['view'], []).append(entry)
+
+    summary = {}
+    for view, entries in views.items():
+        totals = sorted(entry['total_ms'] for entry in entries)
+        count = len(entries)
+        summary[view] = {
+            'requests': count,
+            'avg_ms': round(sum(totals) / count, 2),
+            'p95_ms': totals[max(0, int(count * 0.95) - 1)],
+            'avg_queries': round(sum(entry['queries'] for entry in entries) / count, 1),
+            'avg_db_ms': round(sum(entry['db_ms'] for entry in entries) / count, 2),
+            'avg_template_ms': round(sum(entry['template_ms'] for entry in entries) / count, 2),
+            'duplicates': max((entry['duplicates'] for entry in entries), key=len),
+        }
+    return summary
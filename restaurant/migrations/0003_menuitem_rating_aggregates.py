@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    MenuItem = apps.get_model('restaurant', 'MenuItem')
+    Review = apps.get_model('restaurant', 'Review')
+    per_item = Review.objects.filter(menu_item=OuterRef('pk')).order_by().values('menu_item')
+    MenuItem.objects.update(
+        rating_sum=Coalesce(Subquery(per_item.annotate(total=Sum('rating')).values('total')), 0),
+        rating_count=Coalesce(Subquery(per_item.annotate(total=Count('id')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_reservation_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:35
+
+from datetime import time
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def seed_slots_and_occupancy(apps, schema_editor):
+    TimeSlot = apps.get_model('restaurant', 'TimeSlot')
+    SlotOccupancy = apps.get_model('restaurant', 'SlotOccupancy')
+    Reservation = apps.get_model('restaurant', 'Reservation')
+    # Half-hourly seatings from 11:00 to 22:30, 40 seats each, as a starting point for staff to adjust
+    TimeSlot.objects.bulk_create([
+        TimeSlot(start=time(hour, minute), seats=40) for hour in range(11, 23) for minute in (0, 30)
+    ])
+    seats = dict(TimeSlot.objects.values_list('start', 'seats'))
+    SlotOccupancy.objects.bulk_create([
+        SlotOccupancy(date=row['date'], start=row['time'], capacity=seats.get(row['time'], 0), seats_booked=row['guests'])
+        for row in Reservation.objects.order_by().values('date', 'time').annotate(guests=Sum('number_of_guests'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_dashboardevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.TimeField(unique=True)),
+                ('seats', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='cancelled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start', models.TimeField()),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('seats_booked', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'start'), name='slot_occupancy_unique')],
+            },
+        ),
+        migrations.RunPython(seed_slots_and_occupancy, migrations.RunPython.noop),
+    ]
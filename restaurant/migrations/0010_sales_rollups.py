@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    # The same totals as analytics.rebuild over the whole history, written
+    # against the historical models so later model changes cannot break it
+    Order = apps.get_model('restaurant', 'Order')
+    OrderItem = apps.get_model('restaurant', 'OrderItem')
+    Review = apps.get_model('restaurant', 'Review')
+    DailySales = apps.get_model('restaurant', 'DailySales')
+    DailyItemSales = apps.get_model('restaurant', 'DailyItemSales')
+    days = {}
+    items = {}
+    completed = Order.objects.filter(status='Completed')
+    for row in (
+        completed.annotate(day=TruncDate('order_date')).values('day').order_by()
+        .annotate(order_count=Count('id'), sales=Sum('total_amount'))
+    ):
+        days[row['day']] = DailySales(date=row['day'], orders=row['order_count'], revenue=row['sales'])
+    for row in (
+        OrderItem.objects.filter(order__in=completed)
+        .annotate(day=TruncDate('order__order_date')).values('day', 'menu_item_id').order_by()
+        .annotate(order_count=Count('order_id', distinct=True), units=Sum('quantity'), sales=Sum(F('quantity') * F('price')))
+    ):
+        days[row['day']].items_sold += row['units']
+        items[row['day'], row['menu_item_id']] = DailyItemSales(
+            date=row['day'], menu_item_id=row['menu_item_id'],
+            orders=row['order_count'], quantity=row['units'], revenue=row['sales'],
+        )
+    for row in (
+        Review.objects.filter(menu_item__isnull=False)
+        .annotate(day=TruncDate('created_at')).values('day', 'menu_item_id').order_by()
+        .annotate(ratings=Sum('rating'), reviews=Count('id'))
+    ):
+        item = items.setdefault(
+            (row['day'], row['menu_item_id']),
+            DailyItemSales(date=row['day'], menu_item_id=row['menu_item_id'], revenue=Decimal('0')),
+        )
+        item.rating_sum, item.rating_count = row['ratings'], row['reviews']
+    DailySales.objects.bulk_create(days.values(), batch_size=1000)
+    DailyItemSales.objects.bulk_create(items.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0009_reservation_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name_plural': 'daily sales',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='restaurant.menuitem')),
+            ],
+            options={
+                'verbose_name_plural': 'daily item sales',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'menu_item'), name='daily_item_sales_unique')],
+            },
+        ),
+        # Orders completed before the rollups existed must already be counted,
+        # or cancelling one later would push its day below zero
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# The SQL is copied here rather than imported from restaurant.search, so later
+# changes to that module cannot change what this migration does
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE restaurant_menuitem_fts USING fts5("
+            "name, category, description, available UNINDEXED, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO restaurant_menuitem_fts (restaurant_menuitem_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0, 0.0)')"
+        )
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE restaurant_menuitem_fts_vocab USING fts5vocab(restaurant_menuitem_fts, row)'
+        )
+        schema_editor.execute('''
+            INSERT INTO restaurant_menuitem_fts (rowid, name, category, description, available)
+            SELECT m.id, m.name, COALESCE(c.name, ''), m.description, m.is_available
+            FROM restaurant_menuitem m LEFT JOIN restaurant_category c ON c.id = m.category_id
+        ''')
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE restaurant_menuitem_search (menu_item_id bigint PRIMARY KEY '
+            'REFERENCES restaurant_menuitem (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX restaurant_menuitem_search_document ON restaurant_menuitem_search USING GIN (document)'
+        )
+        schema_editor.execute('''
+            INSERT INTO restaurant_menuitem_search (menu_item_id, document)
+            SELECT m.id,
+                setweight(to_tsvector('simple', m.name), 'A')
+                || setweight(to_tsvector('simple', COALESCE(c.name, '')), 'B')
+                || setweight(to_tsvector('simple', m.description), 'C')
+            FROM restaurant_menuitem m LEFT JOIN restaurant_category c ON c.id = m.category_id
+        ''')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS restaurant_menuitem_fts_vocab')
+        schema_editor.execute('DROP TABLE IF EXISTS restaurant_menuitem_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS restaurant_menuitem_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0011_order_customer_email_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
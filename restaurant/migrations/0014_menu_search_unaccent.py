@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# PostgreSQL's 'simple' configuration keeps accents, so "cafe" never matched
+# "Café". Documents are now folded with unaccent, like SQLite's remove_diacritics;
+# search queries are already folded in Python. SQLite needs no change.
+
+
+def _rebuild_documents(schema_editor, fold):
+    schema_editor.execute('DELETE FROM restaurant_menuitem_search')
+    schema_editor.execute(f'''
+        INSERT INTO restaurant_menuitem_search (menu_item_id, document)
+        SELECT m.id,
+            setweight(to_tsvector('simple', {fold}(m.name)), 'A')
+            || setweight(to_tsvector('simple', {fold}(COALESCE(c.name, ''))), 'B')
+            || setweight(to_tsvector('simple', {fold}(m.description)), 'C')
+        FROM restaurant_menuitem m LEFT JOIN restaurant_category c ON c.id = m.category_id
+    ''')
+
+
+def fold_accents(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        _rebuild_documents(schema_editor, 'unaccent')
+
+
+def keep_accents(apps, schema_editor):
+    # The extension stays; other database objects may use it
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild_documents(schema_editor, '')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0013_order_checkout_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_accents, keep_accents),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.utils import timezone
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -17,16 +19,86 @@ class MenuItem(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=6, decimal_places=2)
     image = models.ImageField(upload_to='menu_images/', blank=True, null=True)
+    # Resized copies written by restaurant.images: [{name, format, width, height}, ...]
+    image_variants = models.JSONField(default=list, blank=True, editable=False)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Running review totals, kept in step by restaurant.signals
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['category', 'name']
+        indexes = [
+            # Public menu: available items listed by category and name
+            models.Index(fields=['category', 'name'], condition=models.Q(is_available=True), name='menuitem_available_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Never write back a stale in-memory copy of fields maintained elsewhere
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in ('rating_sum', 'rating_count', 'image_variants')
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0
+        return round(self.rating_sum / self.rating_count, 1)
+
+    def _variants(self, fmt):
+        return [v for v in self.image_variants if v['format'] == fmt]
+
+    def _srcset(self, fmt):
+        return ', '.join(f"{default_storage.url(v['name'])} {v['width']}w" for v in self._variants(fmt))
+
+    @property
+    def webp_srcset(self):
+        return self._srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset('jpeg')
+
+    @property
+    def image_dimensions(self):
+        variants = self._variants('jpeg')
+        if variants:
+            return variants[-1]['width'], variants[-1]['height']
+        return None
+
+    @property
+    def thumbnail_url(self):
+        variants = self._variants('jpeg')
+        if variants:
+            return default_storage.url(variants[0]['name'])
+        return self.image.url if self.image else None
+
+class Cart(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cart for {self.user.username}"
+
+class CartLine(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='lines')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('cart', 'menu_item')
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item.name}"
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     order_date = models.DateTimeField(auto_now_add=True)
@@ -43,9 +115,23 @@ class Order(models.Model):
     customer_name = models.CharField(max_length=100, blank=True, null=True)
     customer_email = models.EmailField(blank=True, null=True)
     customer_phone = models.CharField(max_length=20, blank=True, null=True)
+    # Rendered into the checkout form; resubmitting it returns this order instead of placing another
+    checkout_token = models.CharField(max_length=64, blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ['-order_date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'checkout_token'], name='order_checkout_token_unique'),
+        ]
+        indexes = [
+            # Staff dashboard: open orders, newest first. Not a partial index because
+            # SQLite cannot match its condition against the bound status__in parameters
+            models.Index(fields=['status', '-order_date'], name='order_status_date_idx'),
+            # Profile: a customer's orders, newest first
+            models.Index(fields=['user', '-order_date'], name='order_user_date_idx'),
+            # Admin search by exact email address
+            models.Index(fields=['customer_email'], name='order_customer_email_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.status}"
@@ -59,6 +145,40 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.menu_item.name} for Order #{self.order.id}"
 
+class DailySales(models.Model):
+    """Completed-order totals for one day, maintained by signals and rebuild_sales_rollups."""
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders, Rs. {self.revenue}"
+
+class DailyItemSales(models.Model):
+    """Per-day sales and new ratings for one menu item."""
+    date = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='daily_sales')
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name_plural = 'daily item sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'menu_item'], name='daily_item_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.quantity} x {self.menu_item_id}"
+
 class Reservation(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
     name = models.CharField(max_length=100)
@@ -70,13 +190,45 @@ class Reservation(models.Model):
     special_requests = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     confirmed = models.BooleanField(default=False)
+    cancelled = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['date', 'time']
+        indexes = [
+            # Staff dashboard: unconfirmed reservations in date order
+            models.Index(fields=['date', 'time'], condition=models.Q(confirmed=False), name='reservation_pending_idx'),
+            models.Index(fields=['user', '-date'], name='reservation_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"Reservation for {self.name} on {self.date} at {self.time}"
 
+class TimeSlot(models.Model):
+    """A bookable seating time and how many guests it can take."""
+    start = models.TimeField(unique=True)
+    seats = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['start']
+
+    def __str__(self):
+        return f"{self.start:%H:%M} ({self.seats} seats)"
+
+class SlotOccupancy(models.Model):
+    """Seats held by reservations for one slot on one day, maintained by signals."""
+    date = models.DateField()
+    start = models.TimeField()
+    capacity = models.PositiveIntegerField(default=0)
+    seats_booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'start'], name='slot_occupancy_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.start:%H:%M}: {self.seats_booked}/{self.capacity}"
+
 class Review(models.Model):
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='reviews', blank=True, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews', null=True, blank=True)
@@ -88,6 +240,55 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('menu_item', 'user') # A user can review a menu item only once
+        indexes = [
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='review_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Review for {self.menu_item.name if self.menu_item else 'General'} by {self.user.username if self.user else 'Anonymous'} - {self.rating} stars"
+
+class Job(models.Model):
+    STATUS_QUEUED = 'Queued'
+    STATUS_RUNNING = 'Running'
+    STATUS_DONE = 'Done'
+    STATUS_FAILED = 'Failed'
+    status_choices = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Enqueueing twice with the same key is a no-op
+    idempotency_key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=status_choices, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} - {self.status}"
+
+class DashboardEvent(models.Model):
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from . import cart
+from .models import Cart, Order, OrderItem
+
+TOKEN_MAX_LENGTH = Order._meta.get_field('checkout_token').max_length
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class UnavailableItems(CheckoutError):
+    def __init__(self, names):
+        super().__init__(f'No longer available: {", ".join(names)}')
+        self.names = names
+
+
+def price_lines(lines):
+    """Price cart ``lines`` from their menu items.
+
+    Returns ``(order_items, unavailable, total)``; ``unavailable`` holds the
+    names of items that have been taken off the menu since they were added.
+    """
+    order_items = []
+    unavailable = []
+    total = Decimal('0.00')
+    # Lines carry the current menu item, so prices always come from the database
+    for line in lines:
+        menu_item = line.menu_item
+        if not menu_item.is_available:
+            unavailable.append(menu_item.name)
+            continue
+        subtotal = menu_item.price * line.quantity
+        order_items.append({'menu_item': menu_item, 'quantity': line.quantity, 'subtotal': subtotal})
+        total += subtotal
+    return order_items, unavailable, total
+
+
+def place_order(user, customer_name, customer_email, customer_phone='', token=None):
+    """Turn the user's cart into a Pending order and empty the cart.
+
+    Returns ``(order, created)``. The cart is locked and read inside the same
+    transaction, so parallel submits cannot both see it full. A repeat of a
+    ``token`` that already placed an order returns that order instead of a
+    second one. Raises EmptyCart or UnavailableItems.
+    """
+    with transaction.atomic():
+        # Every checkout for this user queues here; SQLite already holds the write lock
+        Cart.objects.select_for_update().filter(user=user).values_list('id', flat=True).first()
+        lines = cart.get_lines(user)
+        if not lines:
+            # The usual retry: the first submit already emptied the cart
+            existing = Order.objects.filter(user=user, checkout_token=token).first() if token else None
+            if existing:
+                return existing, False
+            raise EmptyCart('Your order is empty.')
+        order_items, unavailable, total = price_lines(lines)
+        if unavailable:
+            raise UnavailableItems(unavailable)
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    user=user,
+                    customer_name=customer_name,
+                    customer_email=customer_email,
+                    customer_phone=customer_phone,
+                    total_amount=total,
+                    status='Pending',
+                    checkout_token=token or None,
+                )
+        except IntegrityError:
+            # The token already placed an order and the cart has been refilled since
+            return Order.objects.get(user=user, checkout_token=token), False
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item['menu_item'], quantity=item['quantity'], price=item['menu_item'].price)
+            for item in order_items
+        ])
+        cart.clear(user)
+    return order, True
@@ -0,0 +1,105 @@
+import base64
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Below this an exact COUNT(*) is cheap enough and keeps the last page exact
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_row_count(model, using='default'):
+    """The planner's row estimate for ``model``'s table, or None when the database has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(table)]),
+        'mysql': ('SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s', [table]),
+        # Filled in by ANALYZE; the first number of a table's stat is its row count
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    sql, params = queries[connection.vendor]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 only exists once ANALYZE has run
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the table statistics instead of COUNT(*) for unfiltered lists of big tables.
+
+    Filtered lists (search, list_filter) still get an exact count, since the
+    statistics say nothing about how many rows match.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_cursor(values):
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(model, ordering, cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError
+        return [model._meta.get_field(name.lstrip('-')).to_python(value) for name, value in zip(ordering, values)]
+    except (ValueError, TypeError, ValidationError):
+        raise InvalidCursor('Not a valid page cursor.')
+
+
+def after_cursor(queryset, ordering, cursor=None):
+    """``queryset`` in ``ordering``, starting just past the row ``cursor`` points at.
+
+    ``ordering`` must end in a unique field (normally the primary key) so every
+    row has exactly one place. Rows are found by seeking on the ordering's index
+    rather than counting through an OFFSET, so every page costs the same.
+    """
+    queryset = queryset.order_by(*ordering)
+    if not cursor:
+        return queryset
+    values = _decode_cursor(queryset.model, ordering, cursor)
+    # (a, b, c) past (x, y, z): a beyond x, or a = x and b beyond y, or ...
+    conditions = []
+    for position, name in enumerate(ordering):
+        lookup = name.lstrip('-') + ('__lt' if name.startswith('-') else '__gt')
+        ties = {prior.lstrip('-'): value for prior, value in zip(ordering[:position], values)}
+        conditions.append(Q(**ties, **{lookup: values[position]}))
+    return queryset.filter(reduce(operator.or_, conditions))
+
+
+def cut_page(rows, ordering, per_page):
+    """Split the ``per_page + 1`` rows fetched after a cursor into the page and the next cursor."""
+    rows = list(rows)
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, _encode_cursor([getattr(last, name.lstrip('-')) for name in ordering])
@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import F
+
+from .counters import increment
+from .models import Reservation, SlotOccupancy, TimeSlot
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def held_seats(reservation):
+    """The (date, start, guests) a reservation counts against, or None once cancelled."""
+    if reservation.cancelled:
+        return None
+    return (reservation.date, reservation.time, reservation.number_of_guests)
+
+
+def _occupancy_row(date, start):
+    rows = SlotOccupancy.objects.filter(date=date, start=start)
+    if not rows.exists():
+        increment(SlotOccupancy, {'date': date, 'start': start}, {'seats_booked': 0}, defaults=lambda: {
+            'capacity': TimeSlot.objects.filter(start=start).values_list('seats', flat=True).first() or 0,
+        })
+    return rows
+
+
+def adjust_occupancy(date, start, guests):
+    """Record seats taken (or released, with a negative count) without checking capacity."""
+    _occupancy_row(date, start).update(seats_booked=F('seats_booked') + guests)
+
+
+def claim_seats(date, start, guests):
+    # The capacity check and the increment are one statement, so concurrent bookings cannot oversell
+    claimed = _occupancy_row(date, start).filter(seats_booked__lte=F('capacity') - guests).update(
+        seats_booked=F('seats_booked') + guests,
+    )
+    if not claimed:
+        raise SlotUnavailable('Sorry, that time is fully booked. Please choose another time.')
+
+
+def reserve(**fields):
+    """Create a reservation if its slot still has room for the party."""
+    reservation = Reservation(**fields)
+    if not TimeSlot.objects.filter(start=reservation.time).exists():
+        raise SlotUnavailable('Please choose one of the available times.')
+    with transaction.atomic():
+        claim_seats(reservation.date, reservation.time, reservation.number_of_guests)
+        # Already counted, so the signal handlers leave the index alone
+        reservation._held_seats = held_seats(reservation)
+        reservation.save()
+    return reservation
+
+
+def availability(date):
+    """Free seats for every slot on ``date``, read from the occupancy index."""
+    booked = {
+        start: (capacity, seats_booked)
+        for start, capacity, seats_booked in
+        SlotOccupancy.objects.filter(date=date).values_list('start', 'capacity', 'seats_booked')
+    }
+    slots = []
+    for slot in TimeSlot.objects.all():
+        capacity, seats_booked = booked.get(slot.start, (slot.seats, 0))
+        slots.append({'time': slot.start.strftime('%H:%M'), 'available': max(capacity - seats_booked, 0)})
+    return slots
@@ -0,0 +1,80 @@
+import time
+
+from django.core.cache import cache
+
+from .cache import cache_is_shared
+
+STAFF_GROUP_NAME = 'Staff'
+STAFF_ROLE_TIMEOUT = 60 * 15
+STAFF_ROLE_VERSION_KEY = 'restaurant:staff_role_version'
+
+
+def _staff_role_version():
+    version = cache.get(STAFF_ROLE_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a culled version never brings old answers back
+        cache.add(STAFF_ROLE_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(STAFF_ROLE_VERSION_KEY)
+    return version
+
+
+async def _astaff_role_version():
+    version = await cache.aget(STAFF_ROLE_VERSION_KEY)
+    if version is None:
+        await cache.aadd(STAFF_ROLE_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(STAFF_ROLE_VERSION_KEY)
+    return version
+
+
+def _staff_role_key(version, user_id):
+    return f'restaurant:staff_role:{version}:{user_id}'
+
+
+def is_staff_member(user):
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+
+    # Memoized on the user object for the rest of this request, and across
+    # requests only when removing someone from the group clears it for every worker
+    if not hasattr(user, '_is_staff_member'):
+        if not cache_is_shared():
+            user._is_staff_member = user.groups.filter(name=STAFF_GROUP_NAME).exists()
+            return user._is_staff_member
+        key = _staff_role_key(_staff_role_version(), user.pk)
+        is_member = cache.get(key)
+        if is_member is None:
+            is_member = user.groups.filter(name=STAFF_GROUP_NAME).exists()
+            cache.set(key, is_member, STAFF_ROLE_TIMEOUT)
+        user._is_staff_member = is_member
+    return user._is_staff_member
+
+
+async def ais_staff_member(user):
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+
+    if not hasattr(user, '_is_staff_member'):
+        if not cache_is_shared():
+            user._is_staff_member = await user.groups.filter(name=STAFF_GROUP_NAME).aexists()
+            return user._is_staff_member
+        key = _staff_role_key(await _astaff_role_version(), user.pk)
+        is_member = await cache.aget(key)
+        if is_member is None:
+            is_member = await user.groups.filter(name=STAFF_GROUP_NAME).aexists()
+            await cache.aset(key, is_member, STAFF_ROLE_TIMEOUT)
+        user._is_staff_member = is_member
+    return user._is_staff_member
+
+
+def invalidate_staff_role(user_ids=None):
+    if user_ids is None:
+        # Group itself changed, so every cached answer may be wrong
+        # A fresh clock value is always newer than any version still in use
+        cache.set(STAFF_ROLE_VERSION_KEY, time.time_ns(), None)
+        return
+    version = _staff_role_version()
+    cache.delete_many([_staff_role_key(version, user_id) for user_id in user_ids])
@@ -0,0 +1,162 @@
+import bisect
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from django.db import connection
+
+from .cache import get_menu_version
+from .models import MenuItem
+
+FTS_TABLE = 'restaurant_menuitem_fts'
+VOCAB_TABLE = 'restaurant_menuitem_fts_vocab'
+PG_TABLE = 'restaurant_menuitem_search'
+MAX_TERMS = 8
+# How close a misspelt word must be to an indexed one to be replaced by it
+TYPO_CUTOFF = 0.75
+
+# Every backend builds the same document: the name weighs most, then the category, then the description.
+# Accents are folded on both, so "cafe" finds "Café" (unaccent is installed by migration 0014)
+_SQLITE_DOCUMENTS = f'''
+    INSERT INTO {FTS_TABLE} (rowid, name, category, description, available)
+    SELECT m.id, m.name, COALESCE(c.name, ''), m.description, m.is_available
+    FROM restaurant_menuitem m LEFT JOIN restaurant_category c ON c.id = m.category_id
+'''
+_PG_DOCUMENTS = f'''
+    INSERT INTO {PG_TABLE} (menu_item_id, document)
+    SELECT m.id,
+        setweight(to_tsvector('simple', unaccent(m.name)), 'A')
+        || setweight(to_tsvector('simple', unaccent(COALESCE(c.name, ''))), 'B')
+        || setweight(to_tsvector('simple', unaccent(m.description)), 'C')
+    FROM restaurant_menuitem m LEFT JOIN restaurant_category c ON c.id = m.category_id
+'''
+
+
+def backend():
+    return connection.vendor if connection.vendor in ('sqlite', 'postgresql') else None
+
+
+def index_items(item_ids=None):
+    """Rewrite the search documents for ``item_ids``, or for the whole menu when None."""
+    if backend() is None:
+        return
+    item_ids = None if item_ids is None else list(item_ids)
+    if item_ids == []:
+        return
+    table, key, documents = (
+        (FTS_TABLE, 'rowid', _SQLITE_DOCUMENTS) if backend() == 'sqlite' else (PG_TABLE, 'menu_item_id', _PG_DOCUMENTS)
+    )
+    with connection.cursor() as cursor:
+        if item_ids is None:
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(documents)
+        else:
+            placeholders = ', '.join(['%s'] * len(item_ids))
+            cursor.execute(f'DELETE FROM {table} WHERE {key} IN ({placeholders})', item_ids)
+            cursor.execute(f'{documents} WHERE m.id IN ({placeholders})', item_ids)
+
+
+def remove_items(item_ids):
+    item_ids = list(item_ids)
+    if backend() is None or not item_ids:
+        return
+    table, key = (FTS_TABLE, 'rowid') if backend() == 'sqlite' else (PG_TABLE, 'menu_item_id')
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {key} IN ({placeholders})', item_ids)
+
+
+def tokenize(text):
+    # Same folding as the unicode61 tokenizer: lower case, accents removed
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r'\w+', text)[:MAX_TERMS]
+
+
+_vocabulary = {'version': None, 'terms': []}
+
+
+def vocabulary():
+    """Every indexed word, sorted; reloaded when the menu version changes."""
+    version = get_menu_version()
+    if _vocabulary['version'] != version:
+        sql = (
+            f'SELECT term FROM {VOCAB_TABLE}' if backend() == 'sqlite'
+            else f"SELECT word FROM ts_stat('SELECT document FROM {PG_TABLE}')"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            terms = sorted(row[0] for row in cursor.fetchall())
+        _vocabulary.update(version=version, terms=terms)
+    return _vocabulary['terms']
+
+
+def _has_prefix(terms, token):
+    position = bisect.bisect_left(terms, token)
+    return position < len(terms) and terms[position].startswith(token)
+
+
+def correct(token, terms):
+    """The indexed word closest to a misspelt ``token``, or None."""
+    best, best_score = None, TYPO_CUTOFF
+    # Typos rarely hit the first letter, so only words sharing it are compared
+    start = bisect.bisect_left(terms, token[0])
+    end = bisect.bisect_left(terms, chr(ord(token[0]) + 1))
+    matcher = SequenceMatcher(b=token, autojunk=False)
+    for term in terms[start:end]:
+        if abs(len(term) - len(token)) > 3 and len(term) < len(token):
+            continue
+        # Compare against the start of longer words too, so "choco" still finds "chocolate"
+        for candidate in {term, term[:len(token)]}:
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() > best_score and matcher.quick_ratio() > best_score:
+                score = matcher.ratio()
+                if score > best_score:
+                    best, best_score = term, score
+    return best
+
+
+def _query(tokens, limit, available_only):
+    if backend() == 'sqlite':
+        # Each word is quoted, so FTS syntax in the input is matched literally, and prefix-matched
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        availability = 'AND available = 1' if available_only else ''
+        sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {availability} ORDER BY rank LIMIT %s'
+    else:
+        availability = 'AND m.is_available' if available_only else ''
+        match = ' & '.join(f'{token}:*' for token in tokens)
+        sql = (
+            f"SELECT s.menu_item_id FROM {PG_TABLE} s JOIN restaurant_menuitem m ON m.id = s.menu_item_id "
+            f"WHERE s.document @@ to_tsquery('simple', %s) {availability} "
+            f"ORDER BY ts_rank(s.document, to_tsquery('simple', %s)) DESC, m.name LIMIT %s"
+        )
+    params = [match, limit] if backend() == 'sqlite' else [match, match, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_ids(text, limit=20, available_only=True):
+    """Menu item ids matching ``text``, best first.
+
+    Every word must match the start of a word in the name, category or
+    description. Words that match nothing are swapped for the closest indexed
+    word before giving up, so small typos still find the dish.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    if backend() is None:
+        # No index on this database: a plain scan, still usable on small menus
+        items = MenuItem.objects.filter(is_available=True) if available_only else MenuItem.objects.all()
+        for token in tokens:
+            items = items.filter(name__icontains=token)
+        return list(items.order_by('name').values_list('id', flat=True)[:limit])
+    ids = _query(tokens, limit, available_only)
+    if ids:
+        return ids
+    terms = vocabulary()
+    corrected = [token if _has_prefix(terms, token) else correct(token, terms) for token in tokens]
+    if None in corrected or corrected == tokens:
+        return []
+    return _query(corrected, limit, available_only)
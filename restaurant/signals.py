@@ -0,0 +1,266 @@
+from django.db.models import F, QuerySet
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .analytics import COMPLETED, record_order, record_rating
+from .cache import bump_menu_version
+from .events import publish, publish_order_created, publish_reservation_created
+from .jobs import enqueue, numbered_keys
+from .models import Category, MenuItem, Order, Reservation, Review, SlotOccupancy, TimeSlot
+from .images import schedule_variants
+from .reservations import adjust_occupancy, held_seats
+from .roles import invalidate_staff_role
+from .search import index_items, remove_items
+
+
+def _adjust_rating(menu_item_id, rating, count, created_at):
+    if menu_item_id is None:
+        return
+    MenuItem.objects.filter(pk=menu_item_id).update(
+        rating_sum=F('rating_sum') + rating,
+        rating_count=F('rating_count') + count,
+    )
+    record_rating(menu_item_id, created_at, rating, count)
+
+
+_UNKNOWN = object()
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    # Snapshot what this row currently contributes to its item's totals
+    if instance.pk is None:
+        instance._counted_rating = None
+    elif {'menu_item_id', 'rating'} & instance.get_deferred_fields():
+        instance._counted_rating = _UNKNOWN
+    else:
+        instance._counted_rating = (instance.menu_item_id, instance.rating)
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_delete, sender=Review)
+def load_review_rating(sender, instance, **kwargs):
+    if getattr(instance, '_counted_rating', _UNKNOWN) is _UNKNOWN:
+        instance._counted_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('menu_item_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def apply_review_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.menu_item_id, instance.rating)
+    previous = None if created else getattr(instance, '_counted_rating', None)
+    if previous != current:
+        if previous is not None:
+            _adjust_rating(previous[0], -previous[1], -1, instance.created_at)
+        _adjust_rating(current[0], current[1], 1, instance.created_at)
+    instance._counted_rating = current
+
+
+def _deleted_with_menu_item(origin):
+    # origin is the instance or queryset whose delete() cascaded down to this row
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (MenuItem, Category)
+
+
+@receiver(post_delete, sender=Review)
+def revert_review_rating(sender, instance, origin=None, **kwargs):
+    counted = getattr(instance, '_counted_rating', None)
+    # When the item itself is going, its totals and rollup rows go with it;
+    # bumping them here would re-create a rollup row for the deleted item
+    if counted is not None and not _deleted_with_menu_item(origin):
+        _adjust_rating(counted[0], -counted[1], -1, instance.created_at)
+
+
+@receiver(post_init, sender=MenuItem)
+def remember_menu_image(sender, instance, **kwargs):
+    if 'image' not in instance.get_deferred_fields():
+        instance._original_image = instance.image.name or ''
+
+
+@receiver(post_save, sender=MenuItem)
+def queue_image_variants(sender, instance, created, raw=False, **kwargs):
+    if raw or not hasattr(instance, '_original_image'):
+        return
+    image = instance.image.name or ''
+    if image != instance._original_image:
+        instance._original_image = image
+        # Resize after commit so the worker sees the saved image
+        transaction.on_commit(lambda: schedule_variants(instance.pk))
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    if 'status' not in instance.get_deferred_fields():
+        instance._original_status = instance.status
+
+
+# Registered before queue_order_jobs, which moves _original_status on
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_completed = not created and getattr(instance, '_original_status', instance.status) == COMPLETED
+    is_completed = instance.status == COMPLETED
+    if created and is_completed:
+        # Order items are written after the order, so count it once they exist
+        transaction.on_commit(lambda: record_order(instance.pk))
+    elif is_completed and not was_completed:
+        record_order(instance.pk)
+    elif was_completed and not is_completed:
+        record_order(instance.pk, sign=-1)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_deleted_sale(sender, instance, **kwargs):
+    if Order.objects.filter(pk=instance.pk, status=COMPLETED).exists():
+        record_order(instance.pk, sign=-1)
+
+
+@receiver(post_save, sender=Order)
+def queue_order_jobs(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        enqueue('order_placed', {'order_id': instance.pk}, key=f'order-{instance.pk}-placed')
+        # The order items are written after the order itself, so wait for the commit
+        transaction.on_commit(lambda: publish_order_created(instance.pk))
+    elif getattr(instance, '_original_status', instance.status) != instance.status:
+        # Numbered, so an order that comes back to a status still sends the email
+        [key] = numbered_keys([f'order-{instance.pk}-{instance._original_status.lower()}-{instance.status.lower()}'])
+        enqueue('order_status_changed', {'order_id': instance.pk, 'status': instance.status}, key=key)
+        publish('order_status_changed', {'id': instance.pk, 'status': instance.status})
+    instance._original_status = instance.status
+
+
+@receiver(post_init, sender=Reservation)
+def remember_reservation_flags(sender, instance, **kwargs):
+    if 'confirmed' not in instance.get_deferred_fields():
+        instance._original_confirmed = instance.confirmed
+    if 'cancelled' not in instance.get_deferred_fields():
+        instance._original_cancelled = instance.cancelled
+
+
+@receiver(post_save, sender=Reservation)
+def queue_reservation_jobs(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        enqueue('reservation_received', {'reservation_id': instance.pk}, key=f'reservation-{instance.pk}-received')
+        publish_reservation_created(instance)
+    if instance.confirmed and (created or not getattr(instance, '_original_confirmed', True)):
+        enqueue('reservation_confirmed', {'reservation_id': instance.pk}, key=f'reservation-{instance.pk}-confirmed')
+        publish('reservation_confirmed', {'id': instance.pk})
+    if instance.cancelled and not created and not getattr(instance, '_original_cancelled', True):
+        publish('reservation_cancelled', {'id': instance.pk})
+    instance._original_confirmed = instance.confirmed
+    instance._original_cancelled = instance.cancelled
+
+
+@receiver(post_init, sender=Reservation)
+def remember_held_seats(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._held_seats = None
+    elif {'date', 'time', 'number_of_guests', 'cancelled'} & instance.get_deferred_fields():
+        instance._held_seats = _UNKNOWN
+    else:
+        instance._held_seats = held_seats(instance)
+
+
+@receiver(pre_save, sender=Reservation)
+@receiver(pre_delete, sender=Reservation)
+def load_held_seats(sender, instance, **kwargs):
+    if getattr(instance, '_held_seats', _UNKNOWN) is _UNKNOWN:
+        row = Reservation.objects.filter(pk=instance.pk).values_list('date', 'time', 'number_of_guests', 'cancelled').first()
+        instance._held_seats = row[:3] if row and not row[3] else None
+
+
+@receiver(post_save, sender=Reservation)
+def update_slot_occupancy(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = held_seats(instance)
+    previous = getattr(instance, '_held_seats', None)
+    if previous != current:
+        if previous is not None:
+            adjust_occupancy(previous[0], previous[1], -previous[2])
+        if current is not None:
+            adjust_occupancy(*current)
+    instance._held_seats = current
+
+
+@receiver(post_delete, sender=Reservation)
+def release_slot_occupancy(sender, instance, **kwargs):
+    held = getattr(instance, '_held_seats', None)
+    if held is not None:
+        adjust_occupancy(held[0], held[1], -held[2])
+
+
+@receiver(post_save, sender=TimeSlot)
+def update_slot_capacity(sender, instance, raw=False, **kwargs):
+    if not raw:
+        SlotOccupancy.objects.filter(start=instance.start).update(capacity=instance.seats)
+
+
+# Registered before invalidate_menu_cache, whose version bump reloads the search vocabulary
+@receiver(post_save, sender=MenuItem)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_items([instance.pk])
+
+
+@receiver(post_delete, sender=MenuItem)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_items([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created, raw=False, **kwargs):
+    # The category name is part of every item's search document
+    if not raw and not created:
+        index_items(MenuItem.objects.filter(category=instance).values_list('id', flat=True))
+
+
+# Registered after the rating receivers so rebuilt pages see updated totals
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_menu_cache(sender, **kwargs):
+    bump_menu_version()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_staff_role([instance.pk])
+    elif pk_set:
+        invalidate_staff_role(pk_set)
+    else:
+        # group.user_set.clear() does not say which users were removed
+        invalidate_staff_role()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, **kwargs):
+    invalidate_staff_role()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
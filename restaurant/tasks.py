@@ -0,0 +1,60 @@
+from django.core.mail import send_mail
+
+from .jobs import task
+from .models import Order, Reservation
+
+
+@task('order_placed')
+def order_placed(order_id):
+    order = Order.objects.filter(pk=order_id).prefetch_related('items__menu_item').first()
+    if order is None or not order.customer_email:
+        return
+    lines = '\n'.join(f'  {item.quantity} x {item.menu_item.name}' for item in order.items.all())
+    send_mail(
+        f'Sky Food Corner - Order #{order.id} received',
+        f'Hi {order.customer_name},\n\nWe have received your order:\n{lines}\n\n'
+        f'Total: Rs. {order.total_amount}\n\nOur team will process it shortly.',
+        None,
+        [order.customer_email],
+    )
+
+
+@task('order_status_changed')
+def order_status_changed(order_id, status):
+    order = Order.objects.filter(pk=order_id).first()
+    if order is None or not order.customer_email:
+        return
+    send_mail(
+        f'Sky Food Corner - Order #{order.id} is {status.lower()}',
+        f'Hi {order.customer_name},\n\nYour order #{order.id} is now {status.lower()}.',
+        None,
+        [order.customer_email],
+    )
+
+
+@task('reservation_received')
+def reservation_received(reservation_id):
+    reservation = Reservation.objects.filter(pk=reservation_id).first()
+    if reservation is None:
+        return
+    send_mail(
+        'Sky Food Corner - Reservation request received',
+        f'Hi {reservation.name},\n\nWe have received your request for {reservation.number_of_guests} '
+        f'on {reservation.date} at {reservation.time}. We will confirm it shortly.',
+        None,
+        [reservation.email],
+    )
+
+
+@task('reservation_confirmed')
+def reservation_confirmed(reservation_id):
+    reservation = Reservation.objects.filter(pk=reservation_id).first()
+    if reservation is None:
+        return
+    send_mail(
+        'Sky Food Corner - Reservation confirmed',
+        f'Hi {reservation.name},\n\nYour table for {reservation.number_of_guests} on '
+        f'{reservation.date} at {reservation.time} is confirmed. See you soon!',
+        None,
+        [reservation.email],
+    )
@@ -1,7 +1,35 @@
-from django.test import TestCase, RequestFactory
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.auth.models import AnonymousUser
 from django.urls import reverse
+from django.utils import timezone
+from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.contrib.auth.models import Group, User
+from restaurant import cart
+from restaurant.assets import AsgiServeStatic, ServeStatic
 from restaurant.context_processors import order_count
+from restaurant.events import event_stream
+from restaurant import analytics, jobs, reservations, roles, search, transitions
+from restaurant.images import generate_variants
+from restaurant.middleware import RequestProfilerMiddleware, profiles
+from restaurant.models import CartLine, Category, DailyItemSales, DailySales, DashboardEvent, Job, MenuItem, Order, OrderItem, Reservation, Review, SlotOccupancy, TimeSlot
 
 class ContextProcessorTest(TestCase):
     def setUp(self):
@@ -9,6 +37,7 @@ class ContextProcessorTest(TestCase):
 
     def test_order_count_empty(self):
         request = self.factory.get('/')
+        request.user = AnonymousUser()
         middleware = SessionMiddleware(lambda r: None)
         middleware.process_request(request)
         request.session.save()
@@ -16,16 +45,16 @@ class ContextProcessorTest(TestCase):
         result = order_count(request)
         self.assertEqual(result['order_count'], 0)
 
-        def test_order_count_with_items(self):
+    def test_order_count_with_items(self):
+        category = Category.objects.create(name='Coffee')
+        latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        mocha = MenuItem.objects.create(category=category, name='Mocha', description='Chocolatey', price='4.00')
+        user = User.objects.create_user('alice', password='pw')
+        cart.add_item(user, latte.id, 2)
+        cart.add_item(user, mocha.id, 3)
+
         request = self.factory.get('/')
-        middleware = SessionMiddleware(lambda r: None)
-        middleware.process_request(request)
-        
-        request.session['order'] = {
-            '1': {'quantity': 2},
-            '2': {'quantity': 3}
-        }
-        request.session.save()
+        request.user = user
         
         result = order_count(request)
         self.assertEqual(result['order_count'], 5)
@@ -43,3 +72,1228 @@ class AddToOrderAccessTest(TestCase):
         self.assertEqual(response.status_code, 302)
         login_url = reverse('login')
         self.assertIn(login_url, response.url)
+
+class HomeCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Coffee')
+        MenuItem.objects.create(category=self.category, name='Latte', description='Milky', price='3.50')
+        MenuItem.objects.create(category=self.category, name='Mocha', description='Chocolatey', price='4.00')
+        Review.objects.create(menu_item=MenuItem.objects.get(name='Latte'), rating=4, comment='Nice')
+
+    def test_home_is_served_from_cache(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Latte')
+        self.assertContains(response, '★ 4.0')
+
+    def test_cache_invalidated_on_change(self):
+        self.client.get(reverse('home'))
+        MenuItem.objects.create(category=self.category, name='Espresso', description='Strong', price='2.50')
+        Review.objects.create(menu_item=MenuItem.objects.get(name='Mocha'), rating=5)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['menu_items_count'], 3)
+        self.assertEqual(response.context['average_rating'], 4.5)
+        self.assertContains(response, 'Espresso')
+
+class HomeConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+
+    def test_anonymous_revalidation_gets_304(self):
+        response = self.client.get(reverse('home'))
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertContains(response, 'Login to Order')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_menu_change_produces_new_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        self.latte.price = '3.75'
+        self.latte.save()
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '3.75')
+
+    def test_logged_in_users_bypass_cache(self):
+        User.objects.create_user('alice', password='pw')
+        self.client.login(username='alice', password='pw')
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'Add to Order')
+
+class RatingAggregateTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Coffee')
+        self.item = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.alice = User.objects.create_user('alice', password='pw')
+        self.bob = User.objects.create_user('bob', password='pw')
+
+    def test_totals_follow_reviews(self):
+        first = Review.objects.create(menu_item=self.item, user=self.alice, rating=5)
+        Review.objects.create(menu_item=self.item, user=self.bob, rating=2)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.rating_sum, self.item.rating_count), (7, 2))
+        self.assertEqual(self.item.average_rating, 3.5)
+
+        first.rating = 3
+        first.save()
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.rating_sum, self.item.rating_count), (5, 2))
+
+        Review.objects.filter(user=self.bob).delete()
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.rating_sum, self.item.rating_count), (3, 1))
+
+    def test_submit_review_updates_totals(self):
+        self.client.login(username='alice', password='pw')
+        self.client.post(reverse('submit_review'), {'menu_item': self.item.id, 'rating': 4})
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.rating_sum, self.item.rating_count), (4, 1))
+
+    def test_menu_item_save_keeps_totals(self):
+        stale = MenuItem.objects.get(pk=self.item.pk)
+        Review.objects.create(menu_item=self.item, user=self.alice, rating=4)
+        stale.price = '3.75'
+        stale.save()
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.rating_sum, self.item.rating_count), (4, 1))
+
+    def test_rebuild_ratings_fixes_drift(self):
+        Review.objects.create(menu_item=self.item, user=self.alice, rating=4)
+        MenuItem.objects.filter(pk=self.item.pk).update(rating_sum=99, rating_count=7)
+        call_command('rebuild_ratings', batch_size=1, stdout=StringIO())
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.rating_sum, self.item.rating_count), (4, 1))
+
+class StaffDashboardQueryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Coffee')
+        self.items = [
+            MenuItem.objects.create(category=category, name=f'Drink {i}', description='Hot', price='3.00')
+            for i in range(3)
+        ]
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+
+    def create_orders(self, count):
+        orders = Order.objects.bulk_create([
+            Order(user=self.staff, customer_name='Guest', customer_email='guest@example.com', total_amount=9)
+            for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item, quantity=1, price=item.price)
+            for order in orders for item in self.items
+        ])
+        Reservation.objects.bulk_create([
+            Reservation(name='Guest', email='guest@example.com', date='2026-01-01', time='19:00', number_of_guests=2)
+            for _ in range(count)
+        ])
+
+    def assert_dashboard_queries(self, order_count):
+        self.create_orders(order_count)
+        # session, user, order count, orders, items + menu items, reservation count, reservations,
+        # latest event id
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('staff_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pending_orders'].paginator.count, order_count)
+
+    def test_one_order(self):
+        self.assert_dashboard_queries(1)
+
+    def test_ten_orders(self):
+        self.assert_dashboard_queries(10)
+
+    def test_two_hundred_orders(self):
+        self.assert_dashboard_queries(200)
+
+class CheckoutTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Coffee')
+        self.items = [
+            MenuItem.objects.create(category=category, name=f'Drink {i}', description='Hot', price='2.50')
+            for i in range(20)
+        ]
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.login(username='alice', password='pw')
+
+    def set_cart(self, items):
+        for item in items:
+            cart.add_item(self.user, item.id, 2)
+
+    def test_checkout_uses_bulk_queries(self):
+        self.set_cart(self.items)
+        data = {'customer_name': 'Alice', 'customer_email': 'alice@example.com', 'checkout_token': 'token-1'}
+        # session, user, then in one savepoint: cart lock, cart lines + menu items,
+        # order (own savepoint, for the token constraint), queued job (own savepoint),
+        # order items and cart clear
+        with self.assertNumQueries(14):
+            response = self.client.post(reverse('checkout'), data)
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), 20)
+        self.assertEqual(order.total_amount, Decimal('100.00'))
+
+    def test_unavailable_items_reported_together(self):
+        self.set_cart(self.items[:3])
+        MenuItem.objects.filter(pk__in=[self.items[0].pk, self.items[1].pk]).update(is_available=False)
+        data = {'customer_name': 'Alice', 'customer_email': 'alice@example.com'}
+        response = self.client.post(reverse('checkout'), data, follow=True)
+        self.assertRedirects(response, reverse('order_view'))
+        self.assertContains(response, 'Drink 0, Drink 1')
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cart.get_item_count(self.user), 6)
+
+class StaffRoleCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.login(username='alice', password='pw')
+
+    def test_customer_pages_skip_group_query(self):
+        self.client.get(reverse('contact_us'))
+        # session and user only
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('contact_us'))
+        self.assertFalse(response.context['is_staff_member'])
+
+    def test_group_membership_change_invalidates(self):
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 302)
+        staff_group = Group.objects.create(name='Staff')
+        self.user.groups.add(staff_group)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 200)
+        staff_group.user_set.remove(self.user)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 302)
+
+    def test_culled_version_does_not_revive_old_answers(self):
+        staff_group = Group.objects.create(name='Staff')
+        staff_group.user_set.add(self.user)
+        # The version key goes, as a cull at MAX_ENTRIES would drop it
+        cache.delete(roles.STAFF_ROLE_VERSION_KEY)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 200)
+        staff_group.user_set.clear()
+        cache.delete(roles.STAFF_ROLE_VERSION_KEY)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 302)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'roles'}})
+    def test_per_process_cache_only_memoizes_per_request(self):
+        # Another worker could not see this process clear the entry, so none is kept
+        Group.objects.create(name='Staff').user_set.add(self.user)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(roles.is_staff_member(user))
+            self.assertTrue(roles.is_staff_member(user))
+        self.assertFalse([key for key in cache._cache if 'staff_role:' in key])
+
+class CartTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.login(username='alice', password='pw')
+
+    def test_cart_views_use_server_side_lines(self):
+        self.client.post(reverse('add_to_order', args=[self.latte.id]))
+        self.client.post(reverse('add_to_order', args=[self.latte.id]))
+        self.assertNotIn('order', self.client.session)
+        self.assertEqual(cart.get_item_count(self.user), 2)
+
+        MenuItem.objects.filter(pk=self.latte.pk).update(price='4.00')
+        response = self.client.get(reverse('order_view'))
+        self.assertEqual(response.context['total_price'], Decimal('8.00'))
+
+        self.client.post(reverse('update_order_quantity', args=[self.latte.id]), {'quantity': 5})
+        self.assertEqual(cart.get_item_count(self.user), 5)
+        response = self.client.post(reverse('update_order_quantity', args=[self.latte.id]), {'quantity': 10 ** 20}, follow=True)
+        self.assertContains(response, 'Invalid quantity.')
+        self.assertEqual(cart.get_item_count(self.user), 5)
+
+        self.client.post(reverse('remove_from_order', args=[self.latte.id]))
+        self.assertEqual(cart.get_item_count(self.user), 0)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'cart'}})
+    def test_per_process_cache_counts_every_time(self):
+        cart.add_item(self.user, self.latte.id, 2)
+        self.assertEqual(cart.get_item_count(self.user), 2)
+        # A change made without this process clearing its copy, as by another worker
+        CartLine.objects.filter(cart__user=self.user).update(quantity=3)
+        self.assertEqual(cart.get_item_count(self.user), 3)
+
+@override_settings(PROFILE_REQUESTS=True)
+class RequestProfilerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiles.clear()
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+
+    def test_records_timings_and_serves_metrics(self):
+        response = self.client.get(reverse('home'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertEqual(profiles[-1]['view'], 'home')
+        self.assertGreater(profiles[-1]['template_ms'], 0)
+
+        self.client.login(username='staff', password='pw')
+        metrics = self.client.get(reverse('staff_metrics')).json()
+        self.assertEqual(metrics['views']['home']['requests'], 1)
+
+    def test_metrics_are_staff_only(self):
+        response = self.client.get(reverse('staff_metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_flags_repeated_queries(self):
+        category = Category.objects.create(name='Coffee')
+        for i in range(3):
+            MenuItem.objects.create(category=category, name=f'Drink {i}', description='Hot', price='3.00')
+
+        def view(request):
+            # Touches each item's category separately, the classic N+1
+            names = [item.category.name for item in MenuItem.objects.all()]
+            return HttpResponse(', '.join(names))
+
+        request = RequestFactory().get('/')
+        with self.assertLogs('restaurant.middleware', 'WARNING'):
+            RequestProfilerMiddleware(view)(request)
+        self.assertEqual(profiles[-1]['queries'], 4)
+        self.assertEqual(profiles[-1]['duplicates'][0]['count'], 3)
+
+class BenchmarkCommandTest(TransactionTestCase):
+    def test_seed_and_benchmark_report(self):
+        call_command('seed_data', menu_items=20, users=3, orders=30, reservations=5, reviews=25, stdout=StringIO())
+        self.assertEqual(Order.objects.count(), 30)
+        self.assertEqual(Review.objects.count(), 25)
+
+        out = StringIO()
+        call_command('run_benchmarks', concurrency=1, iterations=1, scenario=['home', 'order_flow'], stdout=out)
+        report = json.loads(out.getvalue())
+        checkout = report['scenarios']['order_flow']['steps']['checkout']
+        self.assertEqual(checkout['errors'], 0)
+        self.assertIn('p99_ms', checkout)
+        self.assertEqual(Order.objects.count(), 31)
+
+class MenuImageVariantTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MENU_IMAGE_WIDTHS=[320, 640])
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = Category.objects.create(name='Coffee')
+
+    def upload(self, name='latte.png', size=(1200, 900)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'brown').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_variants_queued_only_when_image_changes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            item = MenuItem.objects.create(category=self.category, name='Latte', description='Milky', price='3.50', image=self.upload())
+        self.assertEqual(len(callbacks), 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            item.price = '3.75'
+            item.save()
+        self.assertEqual(len(callbacks), 0)
+
+    def test_generate_variants(self):
+        item = MenuItem.objects.create(category=self.category, name='Latte', description='Milky', price='3.50', image=self.upload())
+        variants = generate_variants(item.pk)
+        self.assertEqual(sorted((v['format'], v['width'], v['height']) for v in variants), [
+            ('jpeg', 320, 240), ('jpeg', 640, 480), ('webp', 320, 240), ('webp', 640, 480),
+        ])
+        for variant in variants:
+            self.assertTrue(default_storage.exists(variant['name']))
+
+        item.refresh_from_db()
+        self.assertIn('320w', item.webp_srcset)
+        self.assertEqual(item.image_dimensions, (640, 480))
+
+        item.image = self.upload('mocha.png', (400, 300))
+        item.save()
+        generate_variants(item.pk)
+        for variant in variants:
+            self.assertFalse(default_storage.exists(variant['name']))
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.calls = []
+        jobs.handlers['test_job'] = self.handler
+        self.addCleanup(jobs.handlers.pop, 'test_job')
+
+    def handler(self, fail=False):
+        self.calls.append(fail)
+        if fail:
+            raise RuntimeError('boom')
+
+    def test_idempotency_key(self):
+        first = jobs.enqueue('test_job', key='same')
+        second = jobs.enqueue('test_job', key='same')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DONE)
+
+    def test_retry_with_backoff_then_fail(self):
+        job = jobs.enqueue('test_job', {'fail': True}, max_attempts=2)
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        # Not due yet
+        self.assertEqual(jobs.run_pending(), 0)
+        Job.objects.update(run_after=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+
+    def test_order_and_reservation_hooks(self):
+        order = Order.objects.create(customer_name='Alice', customer_email='alice@example.com')
+        order.status = 'Processing'
+        order.save()
+        order.save()
+        reservation = Reservation.objects.create(name='Bob', email='bob@example.com', date='2026-01-01', time='19:00', number_of_guests=2)
+        reservation.confirmed = True
+        reservation.save()
+
+        self.assertEqual(
+            sorted(Job.objects.values_list('name', flat=True)),
+            ['order_placed', 'order_status_changed', 'reservation_confirmed', 'reservation_received'],
+        )
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(Job.objects.exclude(status=Job.STATUS_DONE).exists())
+
+    def test_order_returning_to_a_status_is_announced_again(self):
+        order = Order.objects.create(customer_name='Alice', customer_email='alice@example.com', status='Processing')
+        for status in ('Completed', 'Processing'):
+            order.status = status
+            order.save()
+        transitions.transition_orders([order.id], 'Completed')
+        self.assertEqual(
+            list(Job.objects.filter(name='order_status_changed').order_by('id').values_list('payload__status', flat=True)),
+            ['Completed', 'Processing', 'Completed'],
+        )
+
+class DashboardEventTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+
+    def test_order_and_reservation_changes_are_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer_name='Alice', customer_email='alice@example.com', total_amount=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'Completed'
+            order.save()
+            reservation = Reservation.objects.create(name='Bob', email='bob@example.com', date='2026-01-01', time='19:00', number_of_guests=2)
+            reservation.confirmed = True
+            reservation.save()
+            # Nothing is visible to the poller until the transaction commits
+            self.assertEqual(DashboardEvent.objects.count(), 1)
+
+        events = list(DashboardEvent.objects.values_list('kind', 'payload'))
+        self.assertEqual([kind for kind, _ in events], [
+            'order_created', 'order_status_changed', 'reservation_created', 'reservation_confirmed',
+        ])
+        self.assertEqual(events[1][1], {'id': order.id, 'status': 'Completed'})
+        self.assertEqual(events[2][1]['time'], '19:00')
+
+    async def test_stream_replays_events_after_last_id(self):
+        first = await DashboardEvent.objects.acreate(kind='order_status_changed', payload={'id': 1, 'status': 'Processing'})
+        second = await DashboardEvent.objects.acreate(kind='reservation_confirmed', payload={'id': 7})
+        stream = event_stream(first.id)
+        try:
+            message = await anext(stream)
+        finally:
+            await stream.aclose()
+        self.assertEqual(message, f'id: {second.id}\nevent: reservation_confirmed\ndata: {{"id": 7}}\n\n')
+
+    def test_stream_requires_staff(self):
+        User.objects.create_user('alice', password='pw')
+        self.client.login(username='alice', password='pw')
+        response = self.client.get(reverse('staff_events'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_wsgi_fallback(self):
+        self.client.login(username='staff', password='pw')
+        response = self.client.get(reverse('staff_events'))
+        self.assertEqual(response.status_code, 204)
+
+class AsyncViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.user = User.objects.create_user('alice', password='pw')
+        Order.objects.create(user=self.user, customer_name='Alice', customer_email='alice@example.com', total_amount=7)
+        Review.objects.create(user=self.user, menu_item=self.latte, rating=5)
+        cart.add_item(self.user, self.latte.id, 2)
+
+    async def test_home_under_asgi(self):
+        response = await self.async_client.get(reverse('home'))
+        self.assertContains(response, 'Latte')
+        response = await self.async_client.get(reverse('home'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_logged_in_pages_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('order_view'))
+        self.assertEqual(response.context['total_price'], Decimal('7.00'))
+        self.assertEqual(response.context['order_count'], 2)
+
+        response = await self.async_client.get(reverse('profile'))
+        self.assertEqual(len(response.context['user_orders']), 1)
+        self.assertContains(response, 'Latte')
+
+        response = await self.async_client.get(reverse('submit_review'))
+        self.assertContains(response, 'Latte')
+
+    async def test_review_post_stays_sync(self):
+        response = await self.async_client.post(reverse('submit_review'), {'menu_item': self.latte.id, 'rating': 4})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(await Review.objects.acount(), 2)
+
+class ReservationCapacityTest(TestCase):
+    def setUp(self):
+        TimeSlot.objects.update_or_create(start=time(19), defaults={'seats': 4})
+        self.day = timezone.localdate() + timedelta(days=3)
+
+    def book(self, guests, **fields):
+        return reservations.reserve(
+            name='Guest', email='guest@example.com', date=self.day, time=time(19), number_of_guests=guests, **fields
+        )
+
+    def free_seats(self):
+        with self.assertNumQueries(2):
+            slots = reservations.availability(self.day)
+        return next(slot['available'] for slot in slots if slot['time'] == '19:00')
+
+    def test_bookings_stop_at_capacity(self):
+        self.book(3)
+        self.assertEqual(self.free_seats(), 1)
+        with self.assertRaises(reservations.SlotUnavailable):
+            self.book(2)
+        self.book(1)
+        self.assertEqual(self.free_seats(), 0)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_index_follows_edits_cancellations_and_deletes(self):
+        first = self.book(2)
+        second = Reservation.objects.create(name='Walk-in', email='w@example.com', date=self.day, time='19:00', number_of_guests=1)
+        self.assertEqual(self.free_seats(), 1)
+
+        second.number_of_guests = 2
+        second.save()
+        self.assertEqual(self.free_seats(), 0)
+
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        self.client.post(reverse('cancel_reservation_staff', args=[first.id]))
+        self.assertEqual(self.free_seats(), 2)
+
+        Reservation.objects.get(pk=second.pk).delete()
+        self.assertEqual(self.free_seats(), 4)
+        self.assertEqual(SlotOccupancy.objects.get().seats_booked, 0)
+
+    def test_cancelled_reservations_cannot_be_confirmed(self):
+        reservation = self.book(2)
+        admin_user = User.objects.create_superuser('admin', password='pw')
+        self.client.force_login(admin_user)
+        self.client.post(reverse('cancel_reservation_staff', args=[reservation.id]))
+
+        response = self.client.get(reverse('confirm_reservation_staff', args=[reservation.id]), follow=True)
+        self.assertContains(response, 'cannot be confirmed')
+        self.client.get(reverse('admin:restaurant_reservation_confirm', args=[reservation.id]))
+        response = self.client.post(reverse('admin:restaurant_reservation_changelist'), {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': reservation.id, 'form-0-confirmed': 'on', '_save': 'Save',
+        })
+        self.assertContains(response, 'A cancelled reservation cannot be confirmed.')
+        self.assertFalse(Reservation.objects.get(pk=reservation.pk).confirmed)
+        self.assertEqual(self.free_seats(), 4)
+
+    def test_form_and_availability_endpoint(self):
+        self.book(4)
+        data = {'name': 'Bob', 'email': 'bob@example.com', 'date': self.day.isoformat(), 'time': '19:00', 'number_of_guests': 1}
+        response = self.client.post(reverse('reservation_view'), data, follow=True)
+        self.assertContains(response, 'fully booked')
+        self.assertEqual(Reservation.objects.count(), 1)
+        # The times are in the page without the script; the rejected choice stays picked
+        self.assertContains(response, '<option value="19:00" selected>19:00</option>', html=True)
+        self.assertContains(response, '<option value="19:30">19:30</option>', html=True)
+
+        response = self.client.post(reverse('reservation_view'), {**data, 'time': '19:30'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+        response = self.client.get(reverse('reservation_availability'), {'date': self.day.isoformat()})
+        slots = {slot['time']: slot['available'] for slot in response.json()['slots']}
+        self.assertEqual((slots['19:00'], slots['19:30']), (0, 39))
+        self.assertEqual(self.client.get(reverse('reservation_availability')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('reservation_availability'), {'date': '2026-02-30'}).status_code, 400)
+
+class ReservationRaceTest(TransactionTestCase):
+    def test_parallel_bookings_never_oversell(self):
+        TimeSlot.objects.update_or_create(start=time(20), defaults={'seats': 4})
+        day = date.today() + timedelta(days=1)
+        outcomes = []
+
+        def book():
+            try:
+                reservations.reserve(name='Guest', email='guest@example.com', date=day, time=time(20), number_of_guests=2)
+                outcomes.append(True)
+            except reservations.SlotUnavailable:
+                outcomes.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), [False] * 4 + [True] * 2)
+        self.assertEqual(Reservation.objects.count(), 2)
+        self.assertEqual(SlotOccupancy.objects.get(date=day).seats_booked, 4)
+
+class ExportTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Coffee')
+        latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        mocha = MenuItem.objects.create(category=category, name='Mocha', description='Chocolatey', price='4.00')
+        self.order = Order.objects.create(customer_name='Alice', customer_email='alice@example.com', total_amount='11.00', status='Completed')
+        OrderItem.objects.create(order=self.order, menu_item=latte, quantity=2, price='3.50')
+        OrderItem.objects.create(order=self.order, menu_item=mocha, quantity=1, price='4.00')
+        Order.objects.create(customer_name='Bob', customer_email='bob@example.com', total_amount=0)
+        Reservation.objects.create(name='Carol', email='carol@example.com', date='2026-03-01', time='19:00', number_of_guests=2)
+        Reservation.objects.create(name='Dan', email='dan@example.com', date='2026-04-01', time='19:00', number_of_guests=4, confirmed=True)
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_orders_csv_has_a_row_per_item(self):
+        response = self.client.get(reverse('export_orders'), {'status': 'Completed'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(self.content(response).splitlines()))
+        self.assertEqual([(row['order_id'], row['item'], row['quantity']) for row in rows], [
+            (str(self.order.id), 'Latte', '2'), (str(self.order.id), 'Mocha', '1'),
+        ])
+
+    def test_reservations_ndjson_with_date_range(self):
+        response = self.client.get(reverse('export_reservations'), {'format': 'ndjson', 'start': '2026-03-15', 'status': 'confirmed'})
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([(row['name'], row['guests']) for row in rows], [('Dan', 4)])
+
+    def test_bad_filters_and_access(self):
+        self.assertEqual(self.client.get(reverse('export_orders'), {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_orders'), {'format': 'xlsx'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('export_orders')).status_code, 302)
+
+class SalesRollupTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.mocha = MenuItem.objects.create(category=category, name='Mocha', description='Chocolatey', price='4.00')
+        self.order = Order.objects.create(customer_name='Alice', customer_email='alice@example.com', total_amount='11.00')
+        OrderItem.objects.create(order=self.order, menu_item=self.latte, quantity=2, price='3.50')
+        OrderItem.objects.create(order=self.order, menu_item=self.mocha, quantity=1, price='4.00')
+        self.today = timezone.localdate()
+
+    def totals(self):
+        return (
+            DailySales.objects.filter(date=self.today).values_list('orders', 'items_sold', 'revenue').first(),
+            dict(DailyItemSales.objects.filter(date=self.today).values_list('menu_item__name', 'quantity')),
+        )
+
+    def test_completing_and_reopening_an_order(self):
+        self.assertIsNone(self.totals()[0])
+        self.order.status = 'Completed'
+        self.order.save()
+        self.assertEqual(self.totals(), ((1, 3, Decimal('11.00')), {'Latte': 2, 'Mocha': 1}))
+        self.order.status = 'Completed'
+        self.order.save()
+        self.assertEqual(self.totals()[0], (1, 3, Decimal('11.00')))
+        self.order.status = 'Cancelled'
+        self.order.save()
+        self.assertEqual(self.totals(), ((0, 0, Decimal('0.00')), {'Latte': 0, 'Mocha': 0}))
+
+    def test_reviews_and_deletes(self):
+        Review.objects.create(menu_item=self.latte, rating=4, comment='Nice')
+        Review.objects.create(menu_item=self.latte, rating=5, comment='Great')
+        row = DailyItemSales.objects.get(date=self.today, menu_item=self.latte)
+        self.assertEqual((row.rating_sum, row.rating_count), (9, 2))
+        Order.objects.filter(pk=self.order.pk).update(status='Completed')
+        Order.objects.get(pk=self.order.pk).delete()
+        self.assertEqual(DailySales.objects.get(date=self.today).orders, -1)
+
+    def test_deleting_a_reviewed_item(self):
+        Review.objects.create(menu_item=self.latte, rating=4, comment='Nice')
+        Review.objects.create(menu_item=self.mocha, rating=5, comment='Great')
+        self.latte.delete()
+        self.mocha.category.delete()
+        # No rollup row may be left pointing at a deleted item
+        connection.check_constraints()
+        self.assertFalse(DailyItemSales.objects.exists())
+
+    def test_rebuild_matches_incremental_totals(self):
+        self.order.status = 'Completed'
+        self.order.save()
+        Review.objects.create(menu_item=self.mocha, rating=3, comment='Fine')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Order.objects.create(customer_name='Dan', customer_email='dan@example.com', total_amount='4.00', status='Completed')
+            OrderItem.objects.create(order=other, menu_item=self.mocha, quantity=1, price='4.00')
+        incremental = analytics.report(self.today, self.today)
+        DailySales.objects.all().delete()
+        DailyItemSales.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_sales_rollups', stdout=out)
+        self.assertIn('1 day(s) with sales, 2 item row(s)', out.getvalue())
+        self.assertEqual(analytics.report(self.today, self.today), incremental)
+        self.assertEqual(incremental['orders'], 2)
+        self.assertEqual(incremental['average_order_value'], Decimal('7.50'))
+        self.assertEqual(
+            [(item['menu_item__name'], item['quantity'], item['average_rating']) for item in incremental['top_items']],
+            [('Mocha', 2, 3.0), ('Latte', 2, None)],
+        )
+
+    def test_staff_view_reads_only_the_rollups(self):
+        self.order.status = 'Completed'
+        self.order.save()
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('staff_analytics'))
+        # Session, user, the three rollup queries; no orders are read however many there are
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('staff_analytics'), {'format': 'json'})
+        data = response.json()
+        self.assertEqual((data['orders'], data['revenue']), (1, '11.00'))
+        self.assertContains(self.client.get(reverse('staff_analytics')), 'Latte')
+        self.assertEqual(self.client.get(reverse('staff_analytics'), {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('staff_analytics'), {'start': '2026-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('staff_analytics'), {'end': '2026-02-31'}).status_code, 400)
+
+class AdminChangelistTest(TestCase):
+    ROWS = 10500
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([User(username=f'customer-{i}') for i in range(50)])
+        category = Category.objects.create(name='Coffee')
+        items = MenuItem.objects.bulk_create([
+            MenuItem(category=category, name=f'Item {i}', description='', price='3.00') for i in range(50)
+        ])
+        Order.objects.bulk_create([
+            Order(user=users[i % 50], customer_name=f'Customer {i}', customer_email=f'customer{i}@example.com', total_amount='3.00')
+            for i in range(cls.ROWS)
+        ], batch_size=2000)
+        Reservation.objects.bulk_create([
+            Reservation(name=f'Guest {i}', email='guest@example.com', date='2026-05-01', time='19:00', number_of_guests=2)
+            for i in range(cls.ROWS)
+        ], batch_size=2000)
+        Review.objects.bulk_create([
+            Review(menu_item=items[i % 50], user=users[i // 50 % 50] if i < 2500 else None, rating=4, comment='Good')
+            for i in range(cls.ROWS)
+        ], batch_size=2000)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:restaurant_{model}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_query_counts_do_not_depend_on_rows_shown(self):
+        # Session, user, table statistics, exact count (no statistics yet) and the page
+        for model in ('order', 'reservation', 'review'):
+            with self.subTest(model=model):
+                response, queries = self.changelist(model)
+                self.assertEqual(len(queries), 5, queries)
+                self.assertEqual(response.context['cl'].result_count, self.ROWS)
+
+    def test_estimated_count_once_analyzed(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for model in ('order', 'reservation', 'review'):
+            with self.subTest(model=model):
+                response, queries = self.changelist(model)
+                self.assertFalse([sql for sql in queries if 'COUNT(' in sql.upper()], queries)
+                self.assertEqual(response.context['cl'].result_count, self.ROWS)
+        # Filtered lists still count exactly
+        response, _ = self.changelist('order', status__exact='Completed')
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_order_search_by_id_and_email(self):
+        order = Order.objects.get(customer_email='customer42@example.com')
+        response, queries = self.changelist('order', q=str(order.pk))
+        self.assertEqual([row.pk for row in response.context['cl'].result_list], [order.pk])
+        response, queries = self.changelist('order', q='Customer42@Example.com')
+        self.assertEqual([row.pk for row in response.context['cl'].result_list], [order.pk])
+        self.assertFalse([sql for sql in queries if 'LIKE' in sql.upper()], queries)
+
+class BulkStaffActionTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Coffee')
+        latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.orders = []
+        for status in ('Processing', 'Processing', 'Pending'):
+            order = Order.objects.create(customer_name='Alice', customer_email='alice@example.com', total_amount='3.50', status=status)
+            OrderItem.objects.create(order=order, menu_item=latte, quantity=1, price='3.50')
+            self.orders.append(order)
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+
+    def post(self, name, **data):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse(name), data)
+        return [query['sql'] for query in queries]
+
+    def test_bulk_order_transition_is_one_update(self):
+        events = DashboardEvent.objects.count()
+        queries = self.post('bulk_update_orders', ids=[order.id for order in self.orders], transition='Processing:Completed')
+        self.assertEqual(len([sql for sql in queries if sql.startswith('UPDATE "restaurant_order"')]), 1)
+        self.assertEqual(
+            list(Order.objects.order_by('id').values_list('status', flat=True)), ['Completed', 'Completed', 'Pending'],
+        )
+        self.assertEqual(list(DashboardEvent.objects.filter(id__gt=events).values_list('kind', flat=True)), ['orders_status_changed'])
+        self.assertEqual(Job.objects.filter(name='order_status_changed').count(), 2)
+        self.assertEqual(DailySales.objects.get().orders, 2)
+
+        # Taking completed orders back out of the rollups
+        self.post('bulk_update_orders', ids=[self.orders[0].id], transition='Cancelled')
+        self.assertEqual(DailySales.objects.get().orders, 1)
+
+    def test_invalid_transitions_are_rejected(self):
+        Order.objects.filter(pk=self.orders[0].pk).update(status='Cancelled')
+        self.post('bulk_update_orders', ids=[self.orders[0].id], transition='Cancelled:Pending')
+        response = self.client.post(reverse('update_order_status', args=[self.orders[0].id]), {'status': 'Pending'}, follow=True)
+        self.assertContains(response, 'cannot go from Cancelled to Pending')
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).status, 'Cancelled')
+
+    def test_single_update_writes_only_the_status(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('update_order_status', args=[self.orders[2].id]), {'status': 'Processing'})
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "restaurant_order"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('customer_name', updates[0])
+        self.assertEqual(Order.objects.get(pk=self.orders[2].pk).status, 'Processing')
+
+    def test_bulk_reservation_confirm_and_cancel(self):
+        tonight = timezone.localdate()
+        first = reservations.reserve(name='Carol', email='carol@example.com', date=tonight, time=time(19), number_of_guests=4)
+        second = reservations.reserve(name='Dan', email='dan@example.com', date=tonight, time=time(19), number_of_guests=2)
+        later = reservations.reserve(name='Eve', email='eve@example.com', date=tonight + timedelta(days=1), time=time(19), number_of_guests=2)
+        self.post('bulk_update_reservations', action='confirm', date=tonight.isoformat())
+        self.assertEqual(
+            list(Reservation.objects.order_by('id').values_list('confirmed', flat=True)), [True, True, False],
+        )
+        self.assertEqual(Job.objects.filter(name='reservation_confirmed').count(), 2)
+        response = self.client.post(reverse('bulk_update_reservations'), {'action': 'confirm', 'date': '2026-02-30'}, follow=True)
+        self.assertContains(response, 'Dates must be YYYY-MM-DD.')
+
+        queries = self.post('bulk_update_reservations', action='cancel', ids=[first.id, second.id, later.id])
+        self.assertEqual(len([sql for sql in queries if sql.startswith('UPDATE "restaurant_reservation"')]), 1)
+        self.assertEqual(Reservation.objects.filter(cancelled=True).count(), 3)
+        self.assertEqual(set(SlotOccupancy.objects.values_list('seats_booked', flat=True)), {0})
+        self.assertEqual(DashboardEvent.objects.filter(kind='reservations_cancelled').get().payload['ids'], [first.id, second.id, later.id])
+
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings = override_settings(
+            STATIC_ROOT=cls.root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'restaurant.assets.CompressedManifestStaticFilesStorage'},
+            },
+        )
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(f'{cls.root}/staticfiles.json') as fh:
+            cls.main_js = json.load(fh)['paths']['restaurant/js/main.js']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def get(self, path, **headers):
+        def django(environ, start_response):
+            start_response('404 Not Found', [])
+            return [b'django']
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **headers}
+        captured = {}
+
+        def start_response(status, headers):
+            captured['status'] = status
+            captured['headers'] = dict(headers)
+
+        body = b''.join(ServeStatic(django)(environ, start_response))
+        return captured['status'], captured['headers'], body
+
+    def test_collectstatic_writes_hashed_and_gzipped_files(self):
+        self.assertRegex(self.main_js, r'^restaurant/js/main\.[0-9a-f]{12}\.js$')
+        with open(f'{self.root}/{self.main_js}', 'rb') as original, gzip.open(f'{self.root}/{self.main_js}.gz') as compressed:
+            self.assertEqual(compressed.read(), original.read())
+
+    def test_hashed_files_are_immutable_and_compressed(self):
+        status, headers, body = self.get(f'/static/{self.main_js}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual((headers['Content-Encoding'], headers['Vary']), ('gzip', 'Accept-Encoding'))
+        self.assertIn(b'Sky Food Corner', gzip.decompress(body))
+
+        status, headers, body = self.get(f'/static/{self.main_js}')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(int(headers['Content-Length']), len(body))
+
+        status, _, body = self.get(f'/static/{self.main_js}', HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        # The identity ETag must not validate a cached gzip body, or the other way round
+        _, gzip_headers, _ = self.get(f'/static/{self.main_js}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzip_headers['ETag'], headers['ETag'][:-1] + '-gz"')
+        status, _, _ = self.get(f'/static/{self.main_js}', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual(status, '200 OK')
+        status, _, _ = self.get(f'/static/{self.main_js}', HTTP_IF_NONE_MATCH=gzip_headers['ETag'])
+        self.assertEqual(status, '200 OK')
+
+    async def test_asgi_serves_the_same_files(self):
+        async def django(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'django'})
+
+        async def get(path, headers=()):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers)}
+            await AsgiServeStatic(django)(scope, None, send)
+            return messages[0]['status'], dict(messages[0]['headers']), b''.join(message.get('body', b'') for message in messages[1:])
+
+        status, headers, body = await get(f'/static/{self.main_js}', [(b'accept-encoding', b'gzip')])
+        self.assertEqual((status, headers[b'content-encoding']), (200, b'gzip'))
+        self.assertEqual(headers[b'cache-control'], b'public, max-age=31536000, immutable')
+        self.assertEqual(int(headers[b'content-length']), len(body))
+        self.assertIn(b'Sky Food Corner', gzip.decompress(body))
+        status, _, body = await get(f'/static/{self.main_js}', [(b'accept-encoding', b'gzip'), (b'if-none-match', headers[b'etag'])])
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(await get('/static/restaurant/js/missing.js'), (404, {}, b'django'))
+
+    def test_unhashed_and_unknown_paths(self):
+        _, headers, _ = self.get('/static/restaurant/js/main.js')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(self.get('/static/restaurant/js/missing.js')[2], b'django')
+        self.assertEqual(self.get('/static/../settings.py')[2], b'django')
+
+class MenuSearchTest(TestCase):
+    def setUp(self):
+        coffee = Category.objects.create(name='Coffee')
+        self.desserts = Category.objects.create(name='Desserts')
+        self.latte = MenuItem.objects.create(category=coffee, name='Caffè Latte', description='Espresso with steamed milk', price='3.50')
+        self.mocha = MenuItem.objects.create(category=coffee, name='Mocha', description='A latte with chocolate', price='4.00')
+        self.brownie = MenuItem.objects.create(category=self.desserts, name='Chocolate Brownie', description='Warm and gooey', price='2.50')
+        self.sorbet = MenuItem.objects.create(category=self.desserts, name='Lemon Sorbet', description='Sharp', price='2.00', is_available=False)
+
+    def names(self, query, **kwargs):
+        return [MenuItem.objects.get(pk=pk).name for pk in search.search_ids(query, **kwargs)]
+
+    def test_ranked_prefix_and_accent_insensitive(self):
+        # A match in the name outranks one in the description
+        self.assertEqual(self.names('latte'), ['Caffè Latte', 'Mocha'])
+        self.assertEqual(self.names('caffe lat'), ['Caffè Latte'])
+        self.assertEqual(self.names('choc'), ['Chocolate Brownie', 'Mocha'])
+        self.assertEqual(self.names('dessert'), ['Chocolate Brownie'])
+        self.assertEqual(self.names('"sorbet" OR *'), [])
+        self.assertEqual(self.names('sorbet', available_only=False), ['Lemon Sorbet'])
+
+    def test_typos(self):
+        self.assertEqual(self.names('chocolat browny'), ['Chocolate Brownie'])
+        self.assertEqual(self.names('moca'), ['Mocha'])
+        self.assertEqual(self.names('xyzzy'), [])
+
+    def test_index_follows_menu_changes(self):
+        self.mocha.name = 'Iced Mocha'
+        self.mocha.save()
+        self.assertEqual(self.names('iced'), ['Iced Mocha'])
+        self.desserts.name = 'Sweets'
+        self.desserts.save()
+        self.assertEqual(self.names('sweets'), ['Chocolate Brownie'])
+        self.brownie.delete()
+        self.assertEqual(self.names('choc'), ['Iced Mocha'])
+
+    def test_endpoint_and_admin(self):
+        data = self.client.get(reverse('menu_search'), {'q': 'latte'}).json()
+        self.assertEqual([item['name'] for item in data['results']], ['Caffè Latte', 'Mocha'])
+        self.assertEqual(data['results'][0]['category'], 'Coffee')
+        MenuItem.objects.filter(pk=self.mocha.pk).update(is_available=False)
+        data = self.client.get(reverse('menu_search'), {'q': 'latte'}).json()
+        self.assertEqual([item['name'] for item in data['results']], ['Caffè Latte'])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:restaurant_menuitem_changelist'), {'q': 'sorbet'})
+        self.assertEqual([item.name for item in response.context['cl'].result_list], ['Lemon Sorbet'])
+        self.assertFalse([query['sql'] for query in queries if 'LIKE' in query['sql'].upper()])
+
+    def test_large_menu(self):
+        # Timings belong to run_benchmarks (the menu_search scenario); this only checks the answers
+        MenuItem.objects.bulk_create([
+            MenuItem(category=self.desserts, name=f'Seasonal Special {i}', description=f'Chef recipe number {i} with berries', price='5.00')
+            for i in range(10000)
+        ], batch_size=2000)
+        call_command('rebuild_search_index', stdout=StringIO())
+        # Prefix matching finds 4242x too, but the exact word ranks first
+        self.assertEqual(self.names('special 4242')[0], 'Seasonal Special 4242')
+        self.assertEqual(self.names('brownie')[0], 'Chocolate Brownie')
+        self.assertEqual(self.names('chef recipe 77')[0], 'Seasonal Special 77')
+        self.assertEqual(self.names('seasonl specal 9')[0], 'Seasonal Special 9')
+        self.assertEqual(self.names('gooey desert')[0], 'Chocolate Brownie')
+
+class ProfileHistoryTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(self.user)
+
+    def add_orders(self, count):
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, customer_name='Alice', customer_email='alice@example.com', total_amount=7) for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([OrderItem(order=order, menu_item=self.latte, quantity=2, price='3.50') for order in orders])
+        # Same timestamp for all of them, so only the id can tell pages apart
+        Order.objects.filter(user=self.user).update(order_date=timezone.now())
+
+    def profile_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        return response, len(queries)
+
+    def test_first_page_cost_does_not_grow_with_history(self):
+        self.add_orders(3)
+        self.profile_queries()  # Warms the per-user caches
+        _, few = self.profile_queries()
+        self.add_orders(60)
+        response, many = self.profile_queries()
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.context['user_orders']), 10)
+        self.assertEqual(response.context['user_orders'][0].item_count, 2)
+        self.assertContains(response, 'data-load-more="orders"')
+        self.assertContains(response, '10+')
+
+    def test_load_more_walks_every_order_once(self):
+        self.add_orders(25)
+        url, cursor, seen = reverse('profile_history', args=['orders']), None, []
+        while True:
+            data = self.client.get(url, {'cursor': cursor} if cursor else {}).json()
+            seen += [order['id'] for order in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, sorted(Order.objects.values_list('id', flat=True), reverse=True))
+        self.assertEqual(data['results'][0]['item_count'], 2)
+
+    def test_reservations_and_reviews(self):
+        today = date.today()
+        Reservation.objects.bulk_create([
+            Reservation(user=self.user, name='Alice', email='alice@example.com', date=today + timedelta(days=i % 4), time=time(19), number_of_guests=2)
+            for i in range(12)
+        ])
+        Review.objects.create(user=self.user, menu_item=self.latte, rating=4, comment='Nice')
+        first = self.client.get(reverse('profile_history', args=['reservations'])).json()
+        rest = self.client.get(reverse('profile_history', args=['reservations']), {'cursor': first['next']}).json()
+        dates = [reservation['date'] for reservation in first['results'] + rest['results']]
+        self.assertEqual(len(set(reservation['id'] for reservation in first['results'] + rest['results'])), 12)
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertIsNone(rest['next'])
+        self.assertEqual(first['results'][0]['status'], 'Pending')
+
+        data = self.client.get(reverse('profile_history', args=['reviews'])).json()
+        self.assertEqual(data['results'][0]['menu_item'], 'Latte')
+        self.assertIsNone(data['next'])
+
+    def test_bad_requests(self):
+        url = reverse('profile_history', args=['orders'])
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('profile_history', args=['payments'])).status_code, 404)
+        # Another customer's orders never appear
+        other = User.objects.create_user('bob', password='pw')
+        Order.objects.create(user=other, customer_name='Bob', customer_email='bob@example.com', total_amount=5)
+        self.assertEqual(self.client.get(url).json()['results'], [])
+
+class JsonApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.mocha = MenuItem.objects.create(category=category, name='Mocha', description='Chocolate', price='4.00')
+        self.user = User.objects.create_user('alice', password='pw')
+
+    def test_menu_etag(self):
+        response = self.client.get(reverse('api_menu'))
+        self.assertEqual([item['name'] for item in response.json()['categories'][0]['items']], ['Latte', 'Mocha'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api_menu'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.mocha.price = '4.50'
+        self.mocha.save()
+        response = self.client.get(reverse('api_menu'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['categories'][0]['items'][1]['price'], '4.50')
+
+    def test_cart_round_trip(self):
+        url = reverse('api_cart_add')
+        self.assertEqual(self.client.post(url, {'menu_item_id': self.latte.id}).status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(url, {'menu_item_id': self.latte.id}).json(), {'count': 1})
+        # Session, user, item check, cart, line update, badge count: no redirect or page render
+        with self.assertNumQueries(6):
+            response = self.client.post(url, {'menu_item_id': self.latte.id})
+        self.assertEqual(response.json(), {'count': 2})
+        cart.update_quantity(self.user, self.latte.id, 1)
+        response = self.client.post(url, json.dumps({'menu_item_id': self.mocha.id, 'quantity': 2}), content_type='application/json')
+        self.assertEqual(response.json(), {'count': 3})
+        self.assertEqual(self.client.post(url, {'menu_item_id': 999}).status_code, 404)
+        self.assertEqual(self.client.post(url, {'menu_item_id': self.latte.id, 'quantity': 0}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'menu_item_id': self.latte.id, 'quantity': 10 ** 20}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'menu_item_id': 10 ** 20}).status_code, 400)
+
+        item_url = reverse('api_cart_item', args=[self.latte.id])
+        response = self.client.patch(item_url, json.dumps({'quantity': 10 ** 20}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(item_url, 'quantity=4', content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(cart.get_item_count(self.user), 6)
+        response = self.client.patch(item_url, json.dumps({'quantity': 3}), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.delete(reverse('api_cart_item', args=[self.mocha.id])).status_code, 204)
+        self.assertEqual(self.client.delete(reverse('api_cart_item', args=[self.mocha.id])).status_code, 404)
+
+        data = self.client.get(reverse('api_cart')).json()
+        self.assertEqual(data['items'], [{
+            'menu_item_id': self.latte.id, 'name': 'Latte', 'price': '3.50', 'quantity': 3, 'subtotal': '10.50', 'available': True,
+        }])
+        self.assertEqual((data['count'], data['total']), (3, '10.50'))
+
+    def test_checkout_and_order_status(self):
+        self.client.force_login(self.user)
+        url = reverse('api_checkout')
+        details = json.dumps({'customer_name': 'Alice', 'customer_email': 'alice@example.com'})
+        self.assertEqual(self.client.post(url, details, content_type='application/json').status_code, 400)
+        cart.add_item(self.user, self.latte.id, 2)
+        cart.add_item(self.user, self.mocha.id)
+        MenuItem.objects.filter(pk=self.mocha.pk).update(is_available=False)
+        response = self.client.post(url, details, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['unavailable']), (409, ['Mocha']))
+        cart.remove_item(self.user, self.mocha.id)
+
+        response = self.client.post(url, details, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(response['Location'], reverse('api_order', args=[order.id]))
+        self.assertEqual(cart.get_item_count(self.user), 0)
+
+        Order.objects.filter(pk=order.pk).update(status='Processing')
+        with self.assertNumQueries(4):
+            data = self.client.get(response['Location']).json()
+        self.assertEqual((data['status'], data['total_amount']), ('Processing', '7.00'))
+        self.assertEqual(data['items'], [{'menu_item_id': self.latte.id, 'name': 'Latte', 'quantity': 2, 'price': '3.50'}])
+
+        other = User.objects.create_user('bob', password='pw')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(response['Location']).status_code, 404)
+
+class IdempotentCheckoutTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Coffee')
+        self.latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(self.user)
+        cart.add_item(self.user, self.latte.id, 2)
+
+    def test_resubmitted_form_returns_the_same_order(self):
+        token = self.client.get(reverse('checkout')).context['checkout_token']
+        data = {'customer_name': 'Alice', 'customer_email': 'alice@example.com', 'checkout_token': token}
+        first = self.client.post(reverse('checkout'), data, follow=True)
+        second = self.client.post(reverse('checkout'), data, follow=True)
+        order = Order.objects.get()
+        for response in (first, second):
+            self.assertContains(response, f'Order #{order.id} placed successfully')
+        # A new visit to checkout gets a fresh token
+        cart.add_item(self.user, self.latte.id)
+        self.assertNotEqual(self.client.get(reverse('checkout')).context['checkout_token'], token)
+
+    def test_api_replay_and_refilled_cart(self):
+        url, body = reverse('api_checkout'), json.dumps({'customer_name': 'Alice', 'customer_email': 'alice@example.com'})
+        first = self.client.post(url, body, content_type='application/json', headers={'idempotency-key': 'abc'})
+        self.assertEqual(first.status_code, 201)
+        replay = self.client.post(url, body, content_type='application/json', headers={'idempotency-key': 'abc'})
+        self.assertEqual((replay.status_code, replay.json()), (200, first.json()))
+        # Even with something new in the cart, the old key still means the old order
+        cart.add_item(self.user, self.latte.id)
+        replay = self.client.post(url, body, content_type='application/json', headers={'idempotency-key': 'abc'})
+        self.assertEqual((replay.status_code, replay.json()['id']), (200, first.json()['id']))
+        self.assertEqual(cart.get_item_count(self.user), 1)
+        self.assertEqual(self.client.post(url, body, content_type='application/json', headers={'idempotency-key': 'x' * 65}).status_code, 400)
+        for token in (5, ['abc'], {'key': 'abc'}):
+            body = json.dumps({'customer_name': 'Alice', 'customer_email': 'alice@example.com', 'checkout_token': token})
+            self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
+class CheckoutRaceTest(TransactionTestCase):
+    def test_parallel_submits_place_one_order(self):
+        category = Category.objects.create(name='Coffee')
+        latte = MenuItem.objects.create(category=category, name='Latte', description='Milky', price='3.50')
+        user = User.objects.create_user('alice', password='pw')
+        cart.add_item(user, latte.id, 2)
+        self.client.force_login(user)
+        cookies = self.client.cookies
+        data = {'customer_name': 'Alice', 'customer_email': 'alice@example.com', 'checkout_token': 'double-click'}
+        barrier = threading.Barrier(8)
+        statuses = []
+
+        def submit():
+            client = self.client_class()
+            client.cookies = cookies
+            try:
+                barrier.wait()
+                statuses.append(client.post(reverse('checkout'), data).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [302] * 8)
+        order = Order.objects.get()
+        self.assertEqual(order.items.get().quantity, 2)
+        self.assertEqual(order.total_amount, Decimal('7.00'))
+        self.assertEqual(cart.get_item_count(user), 0)
@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .analytics import COMPLETED, record_orders
+from .events import publish
+from .jobs import enqueue_many, numbered_keys
+from .models import Order, Reservation
+from .reservations import adjust_occupancy
+
+# Where an order may go from each status. Cancelled is final; a completed
+# order can still be cancelled, which takes it back out of the sales rollups
+ORDER_TRANSITIONS = {
+    'Pending': ('Processing', 'Completed', 'Cancelled'),
+    'Processing': ('Pending', 'Completed', 'Cancelled'),
+    'Completed': ('Cancelled',),
+    'Cancelled': (),
+}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def check_order_transition(current, target):
+    if target not in ORDER_TRANSITIONS.get(current, ()):
+        raise InvalidTransition(f'An order cannot go from {current} to {target}.')
+
+
+def transition_orders(order_ids, target, source=None):
+    """Move every order in ``order_ids`` that is in ``source`` (or any status that may
+    reach ``target``) to ``target`` with one UPDATE, and return the ids that moved."""
+    sources = [source] if source else [status for status, targets in ORDER_TRANSITIONS.items() if target in targets]
+    if not sources:
+        raise InvalidTransition(f'No order can be moved to {target}.')
+    for status in sources:
+        check_order_transition(status, target)
+    with transaction.atomic():
+        # Locked so the UPDATE below moves exactly these rows (SQLite serializes writers anyway)
+        previous = dict(
+            Order.objects.select_for_update().filter(pk__in=order_ids, status__in=sources).values_list('id', 'status')
+        )
+        if not previous:
+            return []
+        Order.objects.filter(pk__in=previous, status__in=sources).update(status=target)
+
+        # update() skips the model signals, so do their work for the whole batch
+        moved = sorted(previous)
+        if target == COMPLETED:
+            record_orders(moved)
+        reopened = [order_id for order_id, status in previous.items() if status == COMPLETED]
+        if reopened:
+            record_orders(reopened, sign=-1)
+        keys = numbered_keys(f'order-{order_id}-{previous[order_id].lower()}-{target.lower()}' for order_id in moved)
+        enqueue_many('order_status_changed', [
+            ({'order_id': order_id, 'status': target}, key) for order_id, key in zip(moved, keys)
+        ])
+        publish('orders_status_changed', {'ids': moved, 'status': target})
+    return moved
+
+
+def confirm_reservations(reservation_ids):
+    """Confirm the pending reservations among ``reservation_ids`` with one UPDATE."""
+    with transaction.atomic():
+        pending = Reservation.objects.filter(pk__in=reservation_ids, confirmed=False, cancelled=False)
+        confirmed = sorted(pending.select_for_update().values_list('id', flat=True))
+        if not confirmed:
+            return []
+        pending.filter(pk__in=confirmed).update(confirmed=True)
+        enqueue_many('reservation_confirmed', [
+            ({'reservation_id': reservation_id}, f'reservation-{reservation_id}-confirmed') for reservation_id in confirmed
+        ])
+        publish('reservations_confirmed', {'ids': confirmed})
+    return confirmed
+
+
+def cancel_reservations(reservation_ids):
+    """Cancel the open reservations among ``reservation_ids`` and free their seats."""
+    with transaction.atomic():
+        active = Reservation.objects.filter(pk__in=reservation_ids, cancelled=False)
+        rows = list(active.select_for_update().values_list('id', 'date', 'time', 'number_of_guests'))
+        if not rows:
+            return []
+        cancelled = sorted(row[0] for row in rows)
+        active.filter(pk__in=cancelled).update(cancelled=True)
+        released = defaultdict(int)
+        for _, date, start, guests in rows:
+            released[date, start] += guests
+        for (date, start), guests in released.items():
+            adjust_occupancy(date, start, -guests)
+        publish('reservations_cancelled', {'ids': cancelled})
+    return cancelled
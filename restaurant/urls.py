@@ -1,23 +1,40 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('menu/search/', views.menu_search, name='menu_search'),
     path('register/', views.register, name='register'),
     path('profile/', views.profile, name='profile'),
+    path('profile/history/<slug:section>/', views.profile_history, name='profile_history'),
     path('add_to_order/<int:item_id>/', views.add_to_order, name='add_to_order'),
     path('order/', views.order_view, name='order_view'),
     path('update_order_quantity/<int:item_id>/', views.update_order_quantity, name='update_order_quantity'),
     path('remove_from_order/<int:item_id>/', views.remove_from_order, name='remove_from_order'),
     path('checkout/', views.checkout, name='checkout'),
     path('reserve/', views.reservation_view, name='reservation_view'),
+    path('reserve/availability/', views.reservation_availability, name='reservation_availability'),
     path('contact/', views.contact_us, name='contact_us'),
     path('review/', views.submit_review, name='submit_review'),
+    path('api/menu/', api.menu, name='api_menu'),
+    path('api/cart/', api.cart_detail, name='api_cart'),
+    path('api/cart/items/', api.cart_add, name='api_cart_add'),
+    path('api/cart/items/<int:item_id>/', api.cart_item, name='api_cart_item'),
+    path('api/checkout/', api.checkout, name='api_checkout'),
+    path('api/orders/<int:order_id>/', api.order_status, name='api_order'),
     path('staff/login/', views.staff_login, name='staff_login'),
     path('staff/dashboard/', views.staff_dashboard, name='staff_dashboard'),
+    path('staff/metrics/', views.staff_metrics, name='staff_metrics'),
+    path('staff/analytics/', views.staff_analytics, name='staff_analytics'),
+    path('staff/events/', views.staff_events, name='staff_events'),
+    path('staff/export/orders/', views.export_orders, name='export_orders'),
+    path('staff/export/reservations/', views.export_reservations, name='export_reservations'),
+    path('staff/orders/bulk/', views.bulk_update_orders, name='bulk_update_orders'),
+    path('staff/reservations/bulk/', views.bulk_update_reservations, name='bulk_update_reservations'),
     path('staff/order/<int:order_id>/update/', views.update_order_status, name='update_order_status'),
     path('staff/reservation/<int:reservation_id>/confirm/', views.confirm_reservation_staff, name='confirm_reservation_staff'),
+    path('staff/reservation/<int:reservation_id>/cancel/', views.cancel_reservation_staff, name='cancel_reservation_staff'),
     path('staff/menu/add/', views.add_menu_item, name='add_menu_item'),
     path('staff/menu/<int:item_id>/edit/', views.edit_menu_item, name='edit_menu_item'),
     path('staff/menu/<int:item_id>/delete/', views.delete_menu_item, name='delete_menu_item'),
@@ -1,17 +1,34 @@
+import asyncio
+import uuid
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Category, MenuItem, Order, OrderItem, Reservation, Review
+from .models import MenuItem, Order, OrderItem, Reservation, Review, TimeSlot
 from .forms import MenuItemForm
+from . import analytics, cart, exports, history, orders, reservations, search, transitions
+from .cache import _alist, aget_home_data, aget_home_page, aset_home_page
+from .context_processors import prime_order_count
+from .events import event_stream, latest_event_id
+from .middleware import summarize_profiles
+from .pagination import InvalidCursor, cut_page
+from .roles import is_staff_member
 from django.contrib import messages
 from django.db import transaction
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import login as auth_login, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Avg, Count
+from django.db.models import Count, Prefetch
+from django.core.paginator import Paginator
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from django.utils.http import http_date, quote_etag
 
 def is_staff(user):
-    return user.is_authenticated and (user.is_staff or user.groups.filter(name='Staff').exists())
+    return is_staff_member(user)
 
 def staff_login(request):
     if request.method == 'POST':
@@ -33,36 +50,179 @@ def staff_login(request):
         form = AuthenticationForm()
     return render(request, 'restaurant/staff_login.html', {'form': form})
 
+DASHBOARD_PAGE_SIZE = 25
+
 @user_passes_test(is_staff)
 def staff_dashboard(request):
-    pending_orders = Order.objects.filter(status__in=['Pending', 'Processing']).order_by('-order_date')
-    recent_reservations = Reservation.objects.filter(confirmed=False).order_by('date', 'time')
+    pending_orders = (
+        Order.objects.filter(status__in=['Pending', 'Processing'])
+        .select_related('user')
+        .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('menu_item')))
+        .order_by('-order_date')
+    )
+    recent_reservations = Reservation.objects.filter(confirmed=False, cancelled=False).select_related('user').order_by('date', 'time')
+    
+    # Window both lists so the dashboard stays flat however long the queue gets
+    orders_page = Paginator(pending_orders, DASHBOARD_PAGE_SIZE).get_page(request.GET.get('page'))
+    reservations_page = Paginator(recent_reservations, DASHBOARD_PAGE_SIZE).get_page(request.GET.get('reservations_page'))
     
     context = {
-        'pending_orders': pending_orders,
-        'recent_reservations': recent_reservations,
+        'pending_orders': orders_page,
+        'recent_reservations': reservations_page,
+        # The live feed resumes from here, so nothing between render and connect is lost
+        'last_event_id': latest_event_id(),
     }
     return render(request, 'restaurant/staff_dashboard.html', context)
 
+@user_passes_test(is_staff)
+def staff_metrics(request):
+    return JsonResponse({'views': summarize_profiles()})
+
+@user_passes_test(is_staff)
+async def staff_events(request):
+    if not isinstance(request, ASGIRequest):
+        # A long-lived stream would pin a WSGI worker; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since') or 0
+    try:
+        since = int(since)
+    except ValueError:
+        since = 0
+    response = StreamingHttpResponse(event_stream(since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _export_filters(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        raise ValueError(f'Unknown format "{fmt}".')
+    start = parse_date(request.GET.get('start', '')) if request.GET.get('start') else None
+    end = parse_date(request.GET.get('end', '')) if request.GET.get('end') else None
+    if (request.GET.get('start') and start is None) or (request.GET.get('end') and end is None):
+        raise ValueError('Dates must be YYYY-MM-DD.')
+    return fmt, {'start': start, 'end': end, 'status': request.GET.get('status') or None}
+
+def _export_filename(prefix, filters):
+    return '-'.join([prefix] + [str(filters[key]) for key in ('start', 'end', 'status') if filters[key]])
+
+@user_passes_test(is_staff)
+def export_orders(request):
+    try:
+        fmt, filters = _export_filters(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    rows = exports.order_rows(exports.filter_orders(Order.objects.all(), **filters))
+    return exports.stream(rows, exports.ORDER_COLUMNS, fmt, _export_filename('orders', filters))
+
+@user_passes_test(is_staff)
+def export_reservations(request):
+    try:
+        fmt, filters = _export_filters(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    rows = exports.reservation_rows(exports.filter_reservations(Reservation.objects.all(), **filters))
+    return exports.stream(rows, exports.RESERVATION_COLUMNS, fmt, _export_filename('reservations', filters))
+
+ANALYTICS_DEFAULT_DAYS = 30
+
+@user_passes_test(is_staff)
+def staff_analytics(request):
+    try:
+        end = parse_date(request.GET.get('end', '')) if request.GET.get('end') else timezone.localdate()
+        start = parse_date(request.GET.get('start', '')) if request.GET.get('start') else None
+    except ValueError:
+        end = start = None
+    if end is None or (request.GET.get('start') and start is None):
+        return HttpResponseBadRequest('Dates must be YYYY-MM-DD.')
+    start = start or end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    if start > end:
+        return HttpResponseBadRequest('The start date must not be after the end date.')
+    # Reads only the rollup tables, so the cost does not grow with the number of orders
+    report = analytics.report(start, end)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report)
+    return render(request, 'restaurant/staff_analytics.html', {'report': report})
+
 @user_passes_test(is_staff)
 def update_order_status(request, order_id):
     order = get_object_or_404(Order, id=order_id)
     if request.method == 'POST':
         status = request.POST.get('status')
-        if status in ['Pending', 'Processing', 'Completed', 'Cancelled']:
-            order.status = status
-            order.save()
-            messages.success(request, f'Order #{order.id} status updated to {status}.')
+        if status in transitions.ORDER_TRANSITIONS and status != order.status:
+            try:
+                transitions.check_order_transition(order.status, status)
+            except transitions.InvalidTransition as exc:
+                messages.error(request, str(exc))
+            else:
+                order.status = status
+                order.save(update_fields=['status'])
+                messages.success(request, f'Order #{order.id} status updated to {status}.')
     return redirect('staff_dashboard')
 
 @user_passes_test(is_staff)
 def confirm_reservation_staff(request, reservation_id):
     reservation = get_object_or_404(Reservation, id=reservation_id)
+    if reservation.cancelled:
+        messages.error(request, f'Reservation for {reservation.name} was cancelled and cannot be confirmed.')
+        return redirect('staff_dashboard')
     reservation.confirmed = True
-    reservation.save()
+    reservation.save(update_fields=['confirmed'])
     messages.success(request, f'Reservation for {reservation.name} confirmed.')
     return redirect('staff_dashboard')
 
+@user_passes_test(is_staff)
+def cancel_reservation_staff(request, reservation_id):
+    reservation = get_object_or_404(Reservation, id=reservation_id)
+    if request.method == 'POST' and not reservation.cancelled:
+        reservation.cancelled = True
+        reservation.save(update_fields=['cancelled'])
+        messages.success(request, f'Reservation for {reservation.name} cancelled.')
+    return redirect('staff_dashboard')
+
+def _selected_ids(request):
+    return [int(value) for value in request.POST.getlist('ids') if value.isdigit()]
+
+@user_passes_test(is_staff)
+def bulk_update_orders(request):
+    if request.method == 'POST':
+        ids = _selected_ids(request)
+        # "Processing:Completed" moves only selected orders that are Processing; "Cancelled" takes any that may be cancelled
+        source, _, target = request.POST.get('transition', '').rpartition(':')
+        try:
+            moved = transitions.transition_orders(ids, target, source=source or None)
+        except transitions.InvalidTransition as exc:
+            messages.error(request, str(exc))
+        else:
+            skipped = len(ids) - len(moved)
+            message = f'{len(moved)} order(s) moved to {target}.'
+            if skipped:
+                message += f' {skipped} skipped because their status had already changed.'
+            messages.success(request, message)
+    return redirect('staff_dashboard')
+
+@user_passes_test(is_staff)
+def bulk_update_reservations(request):
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if request.POST.get('date'):
+            # "Confirm all for tonight": every open reservation on that day
+            try:
+                day = parse_date(request.POST['date'])
+            except ValueError:
+                day = None
+            if day is None:
+                messages.error(request, 'Dates must be YYYY-MM-DD.')
+                return redirect('staff_dashboard')
+            ids = list(Reservation.objects.filter(date=day, cancelled=False).values_list('id', flat=True))
+        else:
+            ids = _selected_ids(request)
+        if action == 'confirm':
+            messages.success(request, f'{len(transitions.confirm_reservations(ids))} reservation(s) confirmed.')
+        elif action == 'cancel':
+            messages.success(request, f'{len(transitions.cancel_reservations(ids))} reservation(s) cancelled.')
+    return redirect('staff_dashboard')
+
 @user_passes_test(is_staff)
 def add_menu_item(request):
     if request.method == 'POST':
@@ -98,36 +258,59 @@ def delete_menu_item(request, item_id):
         return redirect('home')
     return render(request, 'restaurant/item_confirm_delete.html', {'item': item})
 
-def home(request):
-    categories = Category.objects.all().order_by('name')
-    menu_items = MenuItem.objects.filter(is_available=True).order_by('category__name', 'name')
-    reviews = Review.objects.all().select_related('menu_item', 'user').order_by('-created_at')[:5]
-    
-    # Get real statistics
-    menu_items_count = MenuItem.objects.filter(is_available=True).count()
+async def _auser(request):
+    # Swap the lazy user for the loaded one so templates and context processors
+    # can read request.user without querying from the event loop
+    request.user = await request.auser()
+    return request.user
+
+async def home(request):
+    user = await _auser(request)
+    data, _ = await asyncio.gather(aget_home_data(), prime_order_count(request))
+    # Anonymous visitors with no pending messages all see the same page
+    shared = not user.is_authenticated and not len(messages.get_messages(request))
+    if shared:
+        etag = quote_etag(data['etag'])
+        last_modified = int(data['last_modified'].timestamp()) if data['last_modified'] else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            content = await aget_home_page(data['etag'])
+            if content is not None:
+                response = HttpResponse(content)
+        if response is not None:
+            _finish_shared_home(response, etag, last_modified)
+            return response
     
-    # Calculate average rating from reviews
-    avg_rating_data = Review.objects.aggregate(avg_rating=Avg('rating'))
-    average_rating = avg_rating_data['avg_rating'] or 0
+    average_rating = data['average_rating']
     
     # Calculate years of service (based on when the first review was created)
-    first_review = Review.objects.order_by('created_at').first()
-    if first_review:
-        years_serving = (datetime.now().date() - first_review.created_at.date()).days // 365
+    first_review_at = data['first_review_at']
+    if first_review_at:
+        years_serving = (datetime.now().date() - first_review_at.date()).days // 365
         if years_serving < 1:
             years_serving = 1
     else:
         years_serving = 10  # Default fallback
     
     context = {
-        'categories': categories,
-        'menu_items': menu_items,
-        'reviews': reviews,
-        'menu_items_count': menu_items_count,
+        'categories': data['categories'],
+        'menu_items': data['menu_items'],
+        'reviews': data['reviews'],
+        'menu_items_count': data['menu_items_count'],
         'average_rating': round(average_rating, 1) if average_rating else 0,
         'years_serving': years_serving,
     }
-    return render(request, 'restaurant/home.html', context)
+    response = render(request, 'restaurant/home.html', context)
+    if shared:
+        await aset_home_page(data['etag'], response.content)
+        _finish_shared_home(response, etag, last_modified)
+    return response
+
+def _finish_shared_home(response, etag, last_modified):
+    response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, no_cache=True)
 
 def register(request):
     if request.method == 'POST':
@@ -142,58 +325,68 @@ def register(request):
     return render(request, 'restaurant/register.html', {'form': form})
 
 @login_required
-def profile(request):
-    user_orders = Order.objects.filter(user=request.user).order_by('-order_date')
-    user_reservations = Reservation.objects.filter(user=request.user).order_by('-date')
-    user_reviews = Review.objects.filter(user=request.user).order_by('-created_at')
+async def profile(request):
+    user = await _auser(request)
+    # Only the first page of each section; the rest comes from profile_history
+    order_rows, reservation_rows, review_rows, _ = await asyncio.gather(
+        _alist(history.page_queryset('orders', user)),
+        _alist(history.page_queryset('reservations', user)),
+        _alist(history.page_queryset('reviews', user)),
+        prime_order_count(request),
+    )
+    user_orders, orders_next = cut_page(order_rows, history.ORDER_ORDERING, history.PAGE_SIZE)
+    user_reservations, reservations_next = cut_page(reservation_rows, history.RESERVATION_ORDERING, history.PAGE_SIZE)
+    user_reviews, reviews_next = cut_page(review_rows, history.REVIEW_ORDERING, history.PAGE_SIZE)
     
     context = {
         'user_orders': user_orders,
         'user_reservations': user_reservations,
         'user_reviews': user_reviews,
+        'orders_next': orders_next,
+        'reservations_next': reservations_next,
+        'reviews_next': reviews_next,
     }
     return render(request, 'restaurant/profile.html', context)
 
+@login_required
+def profile_history(request, section):
+    if section not in history.SECTIONS:
+        raise Http404
+    _, ordering, serialize = history.SECTIONS[section]
+    try:
+        rows, next_cursor = cut_page(
+            history.page_queryset(section, request.user, request.GET.get('cursor')), ordering, history.PAGE_SIZE
+        )
+    except InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'results': [serialize(row) for row in rows], 'next': next_cursor})
+
 @login_required
 def add_to_order(request, item_id):
     item = get_object_or_404(MenuItem, id=item_id)
-    if 'order' not in request.session:
-        request.session['order'] = {}
-    
-    order = request.session['order']
-    item_id_str = str(item_id)
-    
-    if item_id_str in order:
-        order[item_id_str]['quantity'] += 1
-    else:
-        order[item_id_str] = {
-            'name': item.name,
-            'price': float(item.price),
-            'quantity': 1,
-            'image': item.image.url if item.image else None,
-        }
-    
-    request.session['order'] = order
+    cart.add_item(request.user, item.id)
     messages.success(request, f'{item.name} added to order!')
     return redirect('home')
 
 @login_required
-def order_view(request):
+async def order_view(request):
+    user = await _auser(request)
+    lines, _ = await asyncio.gather(cart.aget_lines(user), prime_order_count(request))
     order_items = []
     total_price = 0
     
-    if 'order' in request.session:
-        for item_id, item_data in request.session['order'].items():
-            item_total = item_data['price'] * item_data['quantity']
-            order_items.append({
-                'item_id': item_id,
-                'name': item_data['name'],
-                'price': item_data['price'],
-                'quantity': item_data['quantity'],
-                'subtotal': item_total,
-                'image': item_data.get('image'),
-            })
-            total_price += item_total
+    for line in lines:
+        item = line.menu_item
+        item_total = item.price * line.quantity
+        order_items.append({
+            'item_id': item.id,
+            'name': item.name,
+            'price': item.price,
+            'quantity': line.quantity,
+            'subtotal': item_total,
+            'image': item.thumbnail_url,
+        })
+        total_price += item_total
     
     context = {
         'order_items': order_items,
@@ -204,20 +397,15 @@ def order_view(request):
 @login_required
 def update_order_quantity(request, item_id):
     if request.method == 'POST':
-        quantity = int(request.POST.get('quantity', 0))
-        
-        if 'order' in request.session:
-            order = request.session['order']
-            item_id_str = str(item_id)
-            
-            if item_id_str in order:
-                if quantity <= 0:
-                    del order[item_id_str]
-                else:
-                    order[item_id_str]['quantity'] = quantity
-                
-                request.session['order'] = order
+        try:
+            quantity = int(request.POST.get('quantity', 0))
+            if quantity > cart.MAX_QUANTITY:
+                raise ValueError
+        except ValueError:
+            messages.error(request, 'Invalid quantity.')
+            return redirect('order_view')
         
+        cart.update_quantity(request.user, item_id, quantity)
         messages.success(request, 'Order updated successfully!')
     
     return redirect('order_view')
@@ -225,81 +413,56 @@ def update_order_quantity(request, item_id):
 @login_required
 def remove_from_order(request, item_id):
     if request.method == 'POST':
-        if 'order' in request.session:
-            order = request.session['order']
-            item_id_str = str(item_id)
-            
-            if item_id_str in order:
-                del order[item_id_str]
-                request.session['order'] = order
-                messages.success(request, 'Item removed from order!')
+        if cart.remove_item(request.user, item_id):
+            messages.success(request, 'Item removed from order!')
     
     return redirect('order_view')
 
 @login_required
 def checkout(request):
-    if 'order' in request.session and request.session['order']:
-        order_items = []
-        total_amount = 0
-        
-        for item_id, item_data in request.session['order'].items():
-            item_total = item_data['price'] * item_data['quantity']
-            order_items.append({
-                'menu_item_id': int(item_id),
-                'quantity': item_data['quantity'],
-                'subtotal': item_total,
-            })
-            total_amount += item_total
+    if request.method == 'POST':
+        customer_name = request.POST.get('customer_name')
+        customer_email = request.POST.get('customer_email')
+        customer_phone = request.POST.get('customer_phone', '')
+        token = request.POST.get('checkout_token', '')[:orders.TOKEN_MAX_LENGTH]
         
-        if request.method == 'POST':
-            customer_name = request.POST.get('customer_name')
-            customer_email = request.POST.get('customer_email')
-            customer_phone = request.POST.get('customer_phone', '')
-            
-            if customer_name and customer_email:
-                # Create order
-                with transaction.atomic():
-                    order = Order.objects.create(
-                        user=request.user,
-                        customer_name=customer_name,
-                        customer_email=customer_email,
-                        customer_phone=customer_phone,
-                        total_amount=total_amount,
-                        status='Pending',
-                    )
-                    
-                    # Add order items
-                    for item in order_items:
-                        menu_item = get_object_or_404(MenuItem, id=item['menu_item_id'])
-                        OrderItem.objects.create(
-                            order=order,
-                            menu_item=menu_item,
-                            quantity=item['quantity'],
-                            price=menu_item.price,
-                        )
-                
-                # Clear order
-                request.session['order'] = {}
-                
-                messages.success(request, f'Order #{order.id} placed successfully! Our team will process it shortly.')
+        if customer_name and customer_email:
+            try:
+                order, _ = orders.place_order(request.user, customer_name, customer_email, customer_phone, token=token)
+            except orders.EmptyCart:
+                messages.error(request, 'Your order is empty.')
                 return redirect('home')
-            else:
-                messages.error(request, 'Please fill in all required fields.')
-        
-        # For GET request, prepare form with potential user data
-        customer_name = request.user.first_name + ' ' + request.user.last_name if request.user.first_name or request.user.last_name else request.user.username
-        customer_email = request.user.email
-        
-        context = {
-            'order_items': order_items,
-            'total_amount': total_amount,
-            'customer_name': customer_name,
-            'customer_email': customer_email,
-        }
-        return render(request, 'restaurant/checkout.html', context)
-    else:
+            except orders.UnavailableItems as exc:
+                messages.error(request, f'These items are no longer available, please remove them from your order: {", ".join(exc.names)}.')
+                return redirect('order_view')
+            # A double click lands here twice with the same token and the same order
+            messages.success(request, f'Order #{order.id} placed successfully! Our team will process it shortly.')
+            return redirect('home')
+        messages.error(request, 'Please fill in all required fields.')
+    
+    lines = cart.get_lines(request.user)
+    if not lines:
         messages.error(request, 'Your order is empty.')
         return redirect('home')
+    
+    order_items, unavailable, total_amount = orders.price_lines(lines)
+    if unavailable:
+        messages.error(request, f'These items are no longer available, please remove them from your order: {", ".join(unavailable)}.')
+        return redirect('order_view')
+    
+    # For GET request, prepare form with potential user data
+    customer_name = request.user.first_name + ' ' + request.user.last_name if request.user.first_name or request.user.last_name else request.user.username
+    customer_email = request.user.email
+    
+    context = {
+        'order_items': order_items,
+        'total_amount': total_amount,
+        'customer_name': customer_name,
+        'customer_email': customer_email,
+        # One token per rendered form, kept when the form is shown again after an error
+        'checkout_token': request.POST.get('checkout_token') or uuid.uuid4().hex,
+    }
+    return render(request, 'restaurant/checkout.html', context)
 
 def reservation_view(request):
     if request.method == 'POST':
@@ -313,52 +476,104 @@ def reservation_view(request):
         
         if name and email and date and time and number_of_guests:
             try:
-                reservation = Reservation.objects.create(
-                    user=request.user if request.user.is_authenticated else None,
-                    name=name,
-                    email=email,
-                    phone=phone,
-                    date=date,
-                    time=time,
-                    number_of_guests=int(number_of_guests),
-                    special_requests=special_requests,
-                    confirmed=False,
-                )
-                messages.success(request, 'Reservation request submitted successfully! We will confirm your reservation shortly.')
-                return redirect('home')
+                date, time = parse_date(date), parse_time(time)
+                if date is None or time is None or int(number_of_guests) < 1:
+                    raise ValueError
+                if date < timezone.localdate():
+                    messages.error(request, 'Please choose a date in the future.')
+                else:
+                    reservations.reserve(
+                        user=request.user if request.user.is_authenticated else None,
+                        name=name,
+                        email=email,
+                        phone=phone,
+                        date=date,
+                        time=time,
+                        number_of_guests=int(number_of_guests),
+                        special_requests=special_requests,
+                        confirmed=False,
+                    )
+                    messages.success(request, 'Reservation request submitted successfully! We will confirm your reservation shortly.')
+                    return redirect('home')
             except ValueError:
-                messages.error(request, 'Invalid number of guests.')
+                messages.error(request, 'Invalid date, time or number of guests.')
+            except reservations.SlotUnavailable as exc:
+                messages.error(request, str(exc))
         else:
             messages.error(request, 'Please fill in all required fields.')
     
-    return render(request, 'restaurant/reservation.html')
+    # Every slot is in the page; the script only greys out the full ones for the chosen date
+    return render(request, 'restaurant/reservation.html', {
+        'slot_times': TimeSlot.objects.values_list('start', flat=True),
+    })
+
+def reservation_availability(request):
+    try:
+        date = parse_date(request.GET.get('date', '') or '')
+    except ValueError:
+        # Well-formed but not a real day, such as 2026-02-30
+        date = None
+    if date is None:
+        return JsonResponse({'error': 'Pass a date as YYYY-MM-DD.'}, status=400)
+    return JsonResponse({'date': date.isoformat(), 'slots': reservations.availability(date)})
+
+SEARCH_RESULTS = 20
+
+def menu_search(request):
+    ids = search.search_ids(request.GET.get('q', ''), limit=SEARCH_RESULTS)
+    # The index's availability flag is only kept current by signals, which update() skips
+    items = MenuItem.objects.filter(id__in=ids, is_available=True).select_related('category').only(
+        'id', 'name', 'description', 'price', 'rating_sum', 'rating_count', 'category__id', 'category__name',
+    ).in_bulk()
+    results = [
+        {
+            'id': item.id,
+            'name': item.name,
+            'description': item.description,
+            'price': str(item.price),
+            'category_id': item.category_id,
+            'category': item.category.name,
+            'rating': item.average_rating if item.rating_count else None,
+        }
+        for item in (items[item_id] for item_id in ids if item_id in items)
+    ]
+    return JsonResponse({'query': request.GET.get('q', ''), 'results': results})
 
 def contact_us(request):
     return render(request, 'restaurant/contact_us.html')
 
-def submit_review(request):
+async def submit_review(request):
+    if request.method == 'POST':
+        return await sync_to_async(_post_review)(request)
+    await _auser(request)
+    menu_items, _ = await asyncio.gather(
+        _alist(MenuItem.objects.filter(is_available=True)), prime_order_count(request),
+    )
+    return render(request, 'restaurant/review_form.html', {'menu_items': menu_items})
+
+def _post_review(request):
     menu_items = MenuItem.objects.filter(is_available=True)
     
-    if request.method == 'POST':
-        menu_item_id = request.POST.get('menu_item')
-        rating = request.POST.get('rating')
-        comment = request.POST.get('comment', '')
-        
-        if menu_item_id and rating:
-            try:
-                menu_item = get_object_or_404(MenuItem, id=menu_item_id)
+    menu_item_id = request.POST.get('menu_item')
+    rating = request.POST.get('rating')
+    comment = request.POST.get('comment', '')
+    
+    if menu_item_id and rating:
+        try:
+            menu_item = get_object_or_404(MenuItem, id=menu_item_id)
+            with transaction.atomic():
                 Review.objects.create(
                     user=request.user if request.user.is_authenticated else None,
                     menu_item=menu_item,
                     rating=int(rating),
                     comment=comment,
                 )
-                messages.success(request, 'Thank you for your review!')
-                return redirect('home')
-            except ValueError:
-                messages.error(request, 'Invalid rating value.')
-        else:
-            messages.error(request, 'Please select a menu item and rating.')
+            messages.success(request, 'Thank you for your review!')
+            return redirect('home')
+        except ValueError:
+            messages.error(request, 'Invalid rating value.')
+    else:
+        messages.error(request, 'Please select a menu item and rating.')
     
     context = {
         'menu_items': menu_items,
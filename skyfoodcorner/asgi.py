@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skyfoodcorner.settings')
 
 application = get_asgi_application()
+
+# Imported after setup so settings are configured
+from restaurant.assets import serve_static_asgi  # noqa: E402
+
+application = serve_static_asgi(application)
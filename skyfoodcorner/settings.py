@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restaurant.middleware.RequestProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +52,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request timing and query counts, served at /staff/metrics/.
+# The profiler middleware switches itself off unless this is set.
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS') == '1'
+PROFILE_BUFFER_SIZE = 500
+
 ROOT_URLCONF = 'skyfoodcorner.urls'
 
 TEMPLATES = [
@@ -74,14 +81,86 @@ WSGI_APPLICATION = 'skyfoodcorner.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Selected with DB_ENGINE=sqlite (default) or DB_ENGINE=postgres
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'skyfoodcorner'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # Keep connections open between requests and check them before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock up front so writers queue on busy_timeout
+                # instead of failing with "database is locked" on upgrade
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # In-memory test databases use shared-cache locking, which ignores
+            # busy_timeout, so concurrency tests need a real file
+            'TEST': {'NAME': os.environ.get('DB_TEST_NAME', BASE_DIR / 'test_db.sqlite3')},
+        }
     }
+
+# Applied to every new SQLite connection by restaurant.signals
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+# The menu version, staff roles and cart counts are invalidated from whichever
+# process handles the change, so every worker must share one cache. Selected
+# with CACHE_BACKEND=file (default), redis (REDIS_URL) or locmem (one process only)
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'skyfoodcorner',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+            # One file per key; the default of 300 would keep culling role and cart entries
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Runs the suite against a throwaway cache directory
+TEST_RUNNER = 'restaurant.test_runner.TestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/topics/p
 # #auth-password-validators
@@ -123,10 +202,33 @@ STATICFILES_DIRS = [
     BASE_DIR / 'restaurant/static',
 ]
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Outside DEBUG, collectstatic writes hashed filenames plus .gz/.br copies
+    # (brotli only when the brotli package is installed)
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'restaurant.assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from the WSGI or ASGI process (skyfoodcorner/wsgi.py, asgi.py), hashed
+# files with an immutable one-year Cache-Control, everything else for STATIC_MAX_AGE
+SERVE_STATIC = os.environ.get('SERVE_STATIC', '0' if DEBUG else '1') == '1'
+STATIC_MAX_AGE = 60
+
 # Media files (user-uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Widths of the resized copies made for each uploaded menu image
+MENU_IMAGE_WIDTHS = [320, 640, 960, 1280]
+MENU_IMAGE_WORKERS = 2
+
+# Outgoing mail, sent from background jobs (manage.py run_jobs)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Sky Food Corner <orders@skyfoodcorner.local>')
+
 # Authentication Redirect URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home' # Redirect to home page after login
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skyfoodcorner.settings')
 
 application = get_wsgi_application()
+
+# Imported after setup so settings are configured
+from restaurant.assets import serve_static  # noqa: E402
+
+application = serve_static(application)